@@ -0,0 +1,40 @@
+"""
+Helpers shared by the benchmarks.
+
+Importing this module sets required settings of config.py (values from .env take precedence),
+so benchmarks import it before any module of the bot.
+"""
+import asyncio
+import os
+import socket
+import time
+
+REQUIRED_SETTINGS = {
+    "DAYS_TO_LOAD_FROM_DB": "7",
+    "DAYS_TO_SHOW": "6",
+    "TIMEZONE": "3",
+    "SCHEDULE_UPDATE_INTERVAL": "10",
+    "UPPER_WEEK_START_DATE": "01.09.2025",
+    "SMTP_PORT": "0"
+}
+
+for key, value in REQUIRED_SETTINGS.items():
+    os.environ.setdefault(key, value)
+
+
+def free_port() -> int:
+    with socket.socket() as free_socket:
+        free_socket.bind(("127.0.0.1", 0))
+        return free_socket.getsockname()[1]
+
+
+# Heartbeat task: records the longest gap between ticks (event loop stall)
+async def heartbeat(stop: asyncio.Event, interval: float = 0.005) -> float:
+    worst = 0.0
+    last = time.perf_counter()
+    while not stop.is_set():
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        worst = max(worst, now - last - interval)
+        last = now
+    return worst
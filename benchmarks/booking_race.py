@@ -0,0 +1,85 @@
+"""
+Double booking under concurrent confirmations: check-then-insert vs atomic book_slot.
+
+Many users confirm the same time slot at the same moment on a fresh SQLite database.
+The old flow (is_room_recorded, then create_record in another session) is run without the
+unique slot index, book_slot is run with it. Reports slots that ended up with several records.
+
+Usage:
+    python -m benchmarks.booking_race [--users 20] [--slots 50]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from datetime import date, time as dtime
+
+import benchmarks._common  # required settings of config.py, before modules of the bot
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import database.utils as db_utils
+from database.database import Base, configure_sqlite
+from database.models import Record
+
+BUILDING = "Сормовское ш., 30"
+START, END = dtime(hour=9, minute=30), dtime(hour=10, minute=50)
+
+
+async def check_then_insert(telegram_id: int, room: str, target_date: date) -> bool:
+    if await db_utils.is_room_recorded(BUILDING, room, target_date, START, END):
+        return False
+    await db_utils.create_record(telegram_id, BUILDING, room, target_date, START, END)
+    return True
+
+
+async def atomic(telegram_id: int, room: str, target_date: date) -> bool:
+    return await db_utils.book_slot(telegram_id, BUILDING, room, target_date, START, END) is not None
+
+
+async def run(name: str, book, unique_index: bool, users: int, slots: int):
+    path = os.path.join(tempfile.mkdtemp(), "race.sqlite3")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    configure_sqlite(engine)
+    db_utils.async_session_maker.configure(bind=engine)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        if not unique_index:
+            await conn.execute(text("DROP INDEX ux_records_slot"))
+
+    started = time.perf_counter()
+    confirmed = 0
+    for slot in range(slots):
+        room = str(100 + slot)
+        results = await asyncio.gather(*(book(user, room, date(2025, 10, 1)) for user in range(users)))
+        confirmed += sum(results)
+    elapsed = time.perf_counter() - started
+
+    async with engine.connect() as conn:
+        duplicated = (await conn.execute(
+            select(func.count()).select_from(
+                select(Record.room).group_by(Record.room).having(func.count() > 1).subquery()
+            )
+        )).scalar_one()
+        records = (await conn.execute(select(func.count()).select_from(Record))).scalar_one()
+
+    await engine.dispose()
+    print(f"{name:<20} confirmed {confirmed:>5} | records {records:>5} | "
+          f"double booked slots {duplicated:>4}/{slots} | {elapsed:.2f}s")
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=20, help="users confirming the same slot at once")
+    parser.add_argument("--slots", type=int, default=50, help="number of contested slots")
+    args = parser.parse_args()
+
+    await run("check then insert", check_then_insert, False, args.users, args.slots)
+    await run("book_slot", atomic, True, args.users, args.slots)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
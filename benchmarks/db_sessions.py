@@ -0,0 +1,118 @@
+"""
+Database work of the registration and profile flow: session per helper call vs session per update.
+
+Replays database calls made by profile handlers for every update of the flow
+(/start, registration confirm, /start again, name / email / status edits, profile views, later visits)
+for a number of users on a fresh SQLite database, and counts connection checkouts,
+transactions and SQL statements.
+
+"per helper": calls as handlers made them before DbSessionMiddleware - every helper opens its own session,
+    update_user reads the user in a second session and handlers read it once more afterwards.
+"per update": calls made by handlers now - one session given by DbSessionMiddleware, helpers end its transaction.
+"user cache": the same with user cache (USER_CACHE) on, the first two runs are made without it.
+
+Usage:
+    python -m benchmarks.db_sessions [--users 200]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import benchmarks._common  # required settings of config.py, before modules of the bot
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import database.utils as db_utils
+from bot.middlewares import DbSessionMiddleware
+from database.database import Base, configure_sqlite
+
+
+# Database calls of one update, "session" is None when helpers open their own sessions
+def flow(telegram_id: int, shared: bool) -> list:
+    async def start(session):
+        await db_utils.get_user(telegram_id, session=session)
+
+    async def confirm(session):
+        await db_utils.create_user(telegram_id, "Иванов Иван Иванович", None, f"{telegram_id}@hse.ru",
+                                   "Студент", session=session)
+
+    def edit(**values):
+        async def handler(session):
+            await db_utils.update_user(telegram_id, session=session, **values)
+            if not shared:
+                # update_user read the user in another session, then handler read it again
+                await db_utils.get_user(telegram_id)
+                await db_utils.get_user(telegram_id)
+        return handler
+
+    return [
+        start,
+        confirm,
+        start,
+        edit(full_name="Петров Пётр Петрович"),
+        start,  # profile view
+        edit(email=f"new{telegram_id}@hse.ru", email_verified=True),
+        edit(user_type="Преподаватель"),
+        start,  # later visits
+        start,
+        start,
+    ]
+
+
+async def run(name: str, shared: bool, users: int, cache: bool = False):
+    db_utils.USER_CACHE = db_utils.UserCache(ttl=600 if cache else 0)
+    path = os.path.join(tempfile.mkdtemp(), "sessions.sqlite3")
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    configure_sqlite(engine)
+    db_utils.async_session_maker.configure(bind=engine)
+    middleware = DbSessionMiddleware(db_utils.async_session_maker)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    counters = {"checkouts": 0, "transactions": 0, "statements": 0}
+
+    def count(name):
+        def listener(*args, **kwargs):
+            counters[name] += 1
+        return listener
+
+    event.listen(engine.sync_engine.pool, "checkout", count("checkouts"))
+    # read-only sessions end with rollback, so both count as a transaction
+    event.listen(engine.sync_engine, "commit", count("transactions"))
+    event.listen(engine.sync_engine, "rollback", count("transactions"))
+    event.listen(engine.sync_engine, "before_cursor_execute", count("statements"))
+
+    updates = 0
+    started = time.perf_counter()
+    for telegram_id in range(1, users + 1):
+        for handler in flow(telegram_id, shared):
+            if shared:
+                await middleware(lambda _, data: handler(data["session"]), None, {})
+            else:
+                await handler(None)
+            updates += 1
+    elapsed = time.perf_counter() - started
+
+    await engine.dispose()
+    print(f"{name:<11} {updates} updates in {elapsed:.2f}s | per update: "
+          f"checkouts {counters['checkouts'] / updates:.2f}, transactions {counters['transactions'] / updates:.2f}, "
+          f"statements {counters['statements'] / updates:.2f}"
+          + (f" | user cache hit rate {db_utils.USER_CACHE.stats()['hit_rate']:.0%}" if cache else ""))
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+
+    await run("per helper", False, args.users)
+    await run("per update", True, args.users)
+    await run("user cache", True, args.users, cache=True)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
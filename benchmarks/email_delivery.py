@@ -0,0 +1,112 @@
+"""
+Email delivery: connection per message inside the event loop vs background EmailService.
+
+Starts a local SMTP stand-in (aiosmtpd, optional: pip install aiosmtpd) with artificial latency
+for connection setup (in place of TLS handshake and login) and for every message,
+sends a batch of emails both ways and reports throughput and the worst event loop stall.
+
+Usage:
+    python -m benchmarks.email_delivery [--messages 50] [--workers 2] [--connect-latency 0.3] [--latency 0.05]
+"""
+import argparse
+import asyncio
+import smtplib
+import time
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from benchmarks._common import free_port, heartbeat  # also sets required settings of config.py
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    Controller = None
+
+from email_ver.email_service import EmailService
+
+SENDER = "bot@example.com"
+BODY = "<p>Ваш код подтверждения: <b>123456</b></p>" * 20
+
+
+class SlowHandler:
+    def __init__(self, connect_latency: float, latency: float):
+        self.connect_latency = connect_latency
+        self.latency = latency
+        self.received = 0
+
+    async def handle_EHLO(self, server, session, envelope, hostname, responses):
+        await asyncio.sleep(self.connect_latency)
+        session.host_name = hostname
+        return responses
+
+    async def handle_DATA(self, server, session, envelope):
+        await asyncio.sleep(self.latency)
+        self.received += 1
+        return "250 OK"
+
+
+# The way Email.send_email worked before: new connection for every message, inside the event loop
+def send_inline(port: int, recipient: str):
+    msg = MIMEMultipart()
+    msg['From'] = SENDER
+    msg['To'] = recipient
+    msg['Subject'] = "Код подтверждения"
+    msg.attach(MIMEText(BODY, 'html'))
+    with smtplib.SMTP("127.0.0.1", port) as server:
+        server.sendmail(SENDER, recipient, msg.as_string())
+
+
+async def measure(port: int, messages: int, workers: int | None) -> tuple[float, float, int]:
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stop))
+    await asyncio.sleep(0.05)
+
+    delivered = 0
+    start = time.perf_counter()
+    if workers is None:
+        for i in range(messages):
+            send_inline(port, f"user{i}@hse.ru")
+            delivered += 1
+            await asyncio.sleep(0)
+    else:
+        service = EmailService(host="127.0.0.1", port=port, username=SENDER, password="", sender=SENDER,
+                               starttls=False, workers=workers)
+        statuses = [service.send(f"user{i}@hse.ru", "Код подтверждения", BODY) for i in range(messages)]
+        delivered = sum(await asyncio.gather(*statuses))
+        await service.stop()
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    worst_stall = await beat
+    return elapsed, worst_stall, delivered
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=2, help="EmailService workers (SMTP connections)")
+    parser.add_argument("--connect-latency", type=float, default=0.3, help="connection setup latency, seconds")
+    parser.add_argument("--latency", type=float, default=0.05, help="latency per message, seconds")
+    args = parser.parse_args()
+
+    if Controller is None:
+        print("aiosmtpd is not installed: pip install aiosmtpd")
+        return
+
+    port = free_port()
+
+    handler = SlowHandler(args.connect_latency, args.latency)
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+
+    try:
+        for title, workers in (("inline", None), (f"service x{args.workers}", args.workers)):
+            elapsed, worst_stall, delivered = await measure(port, args.messages, workers)
+            print(f"{title:>12}: {delivered}/{args.messages} emails in {elapsed:.2f}s "
+                  f"({delivered / elapsed:.1f}/s) | worst event loop stall {worst_stall * 1000:.1f} ms")
+    finally:
+        controller.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
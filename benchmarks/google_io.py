@@ -0,0 +1,119 @@
+"""
+Event loop responsiveness during schedule refresh: blocking gspread calls vs dedicated executor.
+
+Starts a local fake Google Sheets server (with artificial latency), points gspread at it
+and measures the worst event loop stall while metadata and worksheet values are fetched.
+
+Usage:
+    python -m benchmarks.google_io [--latency 0.3] [--rounds 5]
+"""
+import argparse
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import gspread
+from aiohttp import web
+from google.auth.credentials import AnonymousCredentials
+from gspread import http_client
+
+from benchmarks._common import heartbeat
+
+SPREADSHEET_ID = "fake-spreadsheet"
+ROWS, COLS = 70, 60
+
+
+# Fake Sheets API server running in a separate thread with its own event loop
+def start_fake_sheets_server(latency: float) -> str:
+    values = [[f"r{i}c{j}" for j in range(COLS)] for i in range(ROWS)]
+
+    async def metadata(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        return web.json_response({
+            "spreadsheetId": SPREADSHEET_ID,
+            "properties": {"title": "fake"},
+            "sheets": [{"properties": {"sheetId": 0, "title": "сормово", "index": 0,
+                                       "gridProperties": {"rowCount": ROWS, "columnCount": COLS}},
+                        "merges": []}],
+        })
+
+    async def values_get(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        return web.json_response({"range": request.match_info["range"], "values": values})
+
+    app = web.Application()
+    app.router.add_get("/v4/spreadsheets/{id}", metadata)
+    app.router.add_get("/v4/spreadsheets/{id}/values/{range}", values_get)
+
+    started = threading.Event()
+    port_holder = {}
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        loop.run_until_complete(site.start())
+        port_holder["port"] = site._server.sockets[0].getsockname()[1]
+        started.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    started.wait()
+    return f"http://127.0.0.1:{port_holder['port']}/v4/spreadsheets"
+
+
+def point_gspread_to(base_url: str):
+    http_client.SPREADSHEET_URL = base_url + "/%s"
+    http_client.SPREADSHEET_VALUES_URL = base_url + "/%s/values/%s"
+
+
+# The refresh I/O performed by ScheduleCalendar.import_schedule
+def refresh_io(spreadsheet: gspread.Spreadsheet):
+    spreadsheet.fetch_sheet_metadata(params={"fields": "sheets.merges"})
+    for worksheet in spreadsheet.worksheets():
+        worksheet.get_all_values()
+
+
+async def measure(spreadsheet: gspread.Spreadsheet, use_executor: bool, rounds: int) -> tuple[float, float]:
+    executor = ThreadPoolExecutor(max_workers=2)
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(stop))
+    await asyncio.sleep(0.05)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        if use_executor:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(executor, functools.partial(refresh_io, spreadsheet))
+            await asyncio.wait_for(future, timeout=30)
+        else:
+            refresh_io(spreadsheet)
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    worst_stall = await beat
+    executor.shutdown()
+    return elapsed, worst_stall
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.3, help="fake server latency per request, seconds")
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    point_gspread_to(start_fake_sheets_server(args.latency))
+    client = gspread.Client(auth=AnonymousCredentials())
+    spreadsheet = client.open_by_key(SPREADSHEET_ID)
+
+    for title, use_executor in (("blocking", False), ("executor", True)):
+        elapsed, worst_stall = await measure(spreadsheet, use_executor, args.rounds)
+        print(f"{title:>9}: {args.rounds} refreshes in {elapsed:.2f}s | worst event loop stall {worst_stall * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
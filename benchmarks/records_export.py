@@ -0,0 +1,117 @@
+"""
+Admin export of records: whole result set and workbook in memory vs streaming into write-only workbook.
+
+For every size a SQLite database with synthetic records is generated (same data as benchmarks.records_indexes),
+then the export is made the way export_database worked before (all records loaded with users, full workbook,
+second pass over cells for widths) and with the current export_database. Peak Python memory
+is measured with tracemalloc (which also slows both runs down).
+
+Usage:
+    python -m benchmarks.records_export [--sizes 10000 30000]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+import benchmarks._common  # required settings of config.py, before modules of the bot
+
+from openpyxl import Workbook
+from openpyxl.styles import Alignment
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import database.utils as db_utils
+from benchmarks.records_indexes import populate, create_indexes
+from bot.admin.utils import export_database
+from config import config
+
+
+# export_database before streaming (without "Телефон" column, users have no phone)
+async def export_in_memory(path: str):
+    loaded_data = await db_utils.get_all_records_n_days()
+    converted_data = [["№ записи", "ФИО", "Тип пользователя", "Telegram", "Email", "Здание", "Аудитория", "Дата", "Временной слот"]]
+    for item in loaded_data:
+        converted_data.append([
+            item.id,
+            item.user.full_name,
+            item.user.user_type,
+            f"https://t.me/{item.user.username}" if item.user.username else f"tg://user?id={item.user.telegram_id}",
+            item.user.email,
+            item.building,
+            item.room,
+            item.date,
+            f"{item.time_slot_start.strftime("%H:%M")}-{item.time_slot_end.strftime("%H:%M")}"
+        ])
+
+    wb = Workbook()
+    sheet = wb.active
+    for row in converted_data:
+        sheet.append(row)
+
+    for column in sheet.columns:
+        max_length = 0
+        column_letter = column[0].column_letter
+        for i, cell in enumerate(column):
+            if i != 0:
+                if column_letter == "H":
+                    cell.number_format = "DD.MM.YYYY"
+                if column_letter == "D":
+                    cell.hyperlink = cell.value
+                if column_letter == "E":
+                    cell.hyperlink = f"mailto:{cell.value}"
+                if column_letter in ["G", "H", "I", "A"]:
+                    cell.alignment = Alignment(horizontal="center")
+            if cell.value:
+                max_length = max(max_length, len(str(cell.value)))
+        sheet.column_dimensions[column_letter].width = max_length + 2
+
+    wb.save(path)
+
+
+async def measure(export) -> tuple[float, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    await export()
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / 2 ** 20
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 30_000])
+    args = parser.parse_args()
+
+    # all synthetic records are exported
+    config.DAYS_TO_LOAD_FROM_DB = 100_000
+    directory = tempfile.mkdtemp()
+    os.chdir(directory)
+
+    for size in args.sizes:
+        path = os.path.join(directory, f"records_{size}.sqlite3")
+        populate(path, size)
+        create_indexes(path)
+        with create_engine(f"sqlite:///{path}").begin() as conn:
+            conn.execute(text(
+                "UPDATE users SET full_name = 'Иванов Иван Иванович ' || telegram_id, user_type = 'Студент', "
+                "email = 'user' || telegram_id || '@edu.hse.ru', "
+                "username = CASE WHEN telegram_id % 2 = 0 THEN 'user_' || telegram_id END"
+            ))
+
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        db_utils.async_session_maker.configure(bind=engine)
+
+        in_memory = await measure(lambda: export_in_memory(os.path.join(directory, "in_memory.xlsx")))
+        streaming = await measure(export_database)
+        await engine.dispose()
+
+        print(f"{size:>8} records | in memory {in_memory[0]:6.2f}s, peak {in_memory[1]:7.1f} MB | "
+              f"streaming {streaming[0]:6.2f}s, peak {streaming[1]:5.1f} MB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+"""
+Latency of the records lookups with and without the composite indexes of the records table.
+
+For every size a SQLite database with synthetic records is generated, the lookups of database/utils.py
+are run through aiosqlite without any index on records, then again after the model indexes are created.
+
+Usage:
+    python -m benchmarks.records_indexes [--sizes 10000 100000 1000000] [--repeat 200]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, time as dtime, timedelta
+
+import benchmarks._common  # required settings of config.py, before modules of the bot
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+import database.utils as db_utils
+from database.database import Base
+from database.models import Record, User
+
+ADDRESSES = ["Сормовское ш., 30", "ул. Родионова, 136", "ул. Львовская, 1в", "ул. Большая Печерская, 25/12", "ул. Костина, 2"]
+TIME_SLOTS = [{"start": dtime(hour=8 + i), "end": dtime(hour=9 + i, minute=20)} for i in range(8)]
+ROOMS = [str(room) for room in range(100, 160)]
+USERS = 5000
+FIRST_DATE = date(2024, 1, 1)
+BATCH = 50_000
+
+
+# Every (building, room, date, slot) is booked once, dates go on until there are enough records
+def synthetic_records(size: int):
+    slots_per_day = len(ADDRESSES) * len(ROOMS) * len(TIME_SLOTS)
+    for i in range(size):
+        day, rest = divmod(i, slots_per_day)
+        building, rest = divmod(rest, len(ROOMS) * len(TIME_SLOTS))
+        room, slot = divmod(rest, len(TIME_SLOTS))
+        yield {
+            "user_id": random.randrange(USERS),
+            "building": ADDRESSES[building],
+            "room": ROOMS[room],
+            "date": FIRST_DATE + timedelta(days=day),
+            "time_slot_start": TIME_SLOTS[slot]["start"],
+            "time_slot_end": TIME_SLOTS[slot]["end"],
+        }
+
+
+def populate(path: str, size: int) -> date:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for index in Record.__table__.indexes:
+            conn.execute(text(f"DROP INDEX {index.name}"))
+        conn.execute(insert(User), [{"telegram_id": user} for user in range(USERS)])
+
+        batch = []
+        last_date = FIRST_DATE
+        for record in synthetic_records(size):
+            batch.append(record)
+            last_date = record["date"]
+            if len(batch) == BATCH:
+                conn.execute(insert(Record), batch)
+                batch.clear()
+        if batch:
+            conn.execute(insert(Record), batch)
+    engine.dispose()
+    return last_date
+
+
+def create_indexes(path: str):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        for index in Record.__table__.indexes:
+            index.create(conn)
+        conn.execute(text("ANALYZE"))
+    engine.dispose()
+
+
+async def measure(path: str, last_date: date, repeat: int) -> dict[str, float]:
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    db_utils.async_session_maker.configure(bind=engine)
+    days = (last_date - FIRST_DATE).days + 1
+
+    def random_slot():
+        slot = random.choice(TIME_SLOTS)
+        return (random.choice(ADDRESSES), random.choice(ROOMS),
+                FIRST_DATE + timedelta(days=random.randrange(days)), slot["start"], slot["end"])
+
+    lookups = {
+        "get_user_records": lambda: db_utils.get_user_records(random.randrange(USERS)),
+        "get_records_by_building_room_date": lambda: db_utils.get_records_by_building_room_date(*random_slot()[:3]),
+        "is_room_recorded": lambda: db_utils.is_room_recorded(*random_slot()),
+        "check_if_booked": lambda: db_utils.check_if_booked(*random_slot()),
+        "get_records_by_period (1 day)": lambda: db_utils.get_records_by_period(*[random_slot()[2]] * 2),
+    }
+
+    results = {}
+    for name, lookup in lookups.items():
+        await lookup() # warm up connection pool and statement cache
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            await lookup()
+            timings.append(time.perf_counter() - started)
+        results[name] = statistics.median(timings) * 1000
+
+    await engine.dispose()
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=200, help="runs of every lookup (median is reported)")
+    args = parser.parse_args()
+
+    random.seed(0)
+    for size in args.sizes:
+        path = os.path.join(tempfile.mkdtemp(), "records.sqlite3")
+        last_date = populate(path, size)
+        before = await measure(path, last_date, args.repeat)
+        create_indexes(path)
+        after = await measure(path, last_date, args.repeat)
+        os.remove(path)
+
+        print(f"\n{size:,} records (median ms)")
+        print(f"{'lookup':<36}{'no indexes':>12}{'indexes':>12}{'speedup':>10}")
+        for name in before:
+            print(f"{name:<36}{before[name]:>12.3f}{after[name]:>12.3f}{before[name] / after[name]:>9.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
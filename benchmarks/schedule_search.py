@@ -0,0 +1,87 @@
+"""
+Latency of room search (ScheduleCalendar.search_rooms) on a synthetic schedule.
+
+Builds buildings with rooms of different capacity, equipment and zoom support (a part of slots busy),
+then runs search by capacity only, by date, by date and slot and by equipment ("zoom" is a flag of the room,
+not an item of its equipment list) and checks that every found room has the requested equipment.
+
+Usage:
+    python -m benchmarks.schedule_search [--buildings 5] [--rooms 60] [--repeat 2000]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+import benchmarks._common  # required settings of config.py, before modules of the bot
+
+from google.availability import AvailabilityStore
+from google.schedule import Building, DateCell, Room, ScheduleCalendar, ScheduleSnapshot
+
+EQUIPMENT = ["Проектор", "Компьютеры", "Маркерная доска", "Интерактивная панель"]
+
+
+def synthetic_snapshot(buildings: int, rooms: int, days: int) -> ScheduleSnapshot:
+    random.seed(1)
+    first_day = datetime(2025, 10, 1)
+    items = []
+    for building_index in range(buildings):
+        building = Building(f"корпус{building_index}", f"адрес {building_index}")
+        building_rooms = []
+        for room_index in range(rooms):
+            room = Room(str(100 + room_index), "Лекционная", random.choice([20, 25, 40, 60, 90, 120]),
+                        random.sample(EQUIPMENT, random.randint(0, 3)), zoom=room_index % 4 == 0)
+            for day in range(days):
+                date_cell = DateCell(first_day + timedelta(days=day))
+                for slot in date_cell.time_slots:
+                    slot.status.is_free = random.random() < 0.4
+                room.add_date(date_cell)
+            building_rooms.append(room)
+        building.add_rooms(building_rooms)
+        items.append(building)
+
+    dates = tuple((first_day + timedelta(days=day)).date() for day in range(days))
+    return ScheduleSnapshot(items, AvailabilityStore.from_buildings(items, dates))
+
+
+async def measure(search, repeat: int) -> tuple[float, list[Room]]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        found = await search()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1e6, found
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--buildings", type=int, default=5)
+    parser.add_argument("--rooms", type=int, default=60, help="rooms per building")
+    parser.add_argument("--days", type=int, default=6)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    calendar = ScheduleCalendar()
+    calendar.snapshot = synthetic_snapshot(args.buildings, args.rooms, args.days)
+    iso_date = calendar.snapshot.availability.dates[1].isoformat()
+
+    cases = {
+        "capacity": ({}, None),
+        "date": ({"iso_date": iso_date}, None),
+        "date + slot": ({"iso_date": iso_date, "slot_index": 3}, None),
+        "equipment": ({"equipment": ["проектор"]}, lambda room: "проектор" in map(str.lower, room.equipment)),
+        "zoom": ({"equipment": ["Zoom"]}, lambda room: room.zoom),
+        "zoom + equipment": ({"equipment": ["zoom", "проектор"]},
+                             lambda room: room.zoom and "проектор" in map(str.lower, room.equipment)),
+    }
+    for title, (filters, has_equipment) in cases.items():
+        median, found = await measure(lambda: calendar.search_rooms("корпус0", "large", **filters), args.repeat)
+        if has_equipment is not None:
+            assert found and all(has_equipment(room) for room in found), f"wrong rooms found by {title}"
+        print(f"{title:<17} {len(found):>3} rooms | median {median:7.1f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,165 @@
+"""
+Updates delivery: long polling vs webhook with UpdateProcessor.
+
+Starts a local stand-in for Telegram Bot API (getMe, getUpdates with artificial round-trip latency),
+feeds the same synthetic messages to a dispatcher both ways and reports updates per second
+and whether updates of every chat were handled in order. Handler simulates database / API work with a sleep.
+
+Usage:
+    python -m benchmarks.updates_delivery [--updates 2000] [--chats 20] [--work 0.02] [--rtt 0.05]
+                                          [--concurrency 32] [--connections 40]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks._common import free_port  # also sets required settings of config.py
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Message
+from aiohttp import ClientSession, web
+
+from bot.webhook import UpdateProcessor, create_webhook_app
+
+TOKEN = "42:BENCHMARK"
+
+
+def synthetic_updates(count: int, chats: int) -> list[dict]:
+    updates = []
+    for i in range(count):
+        chat_id = 1000 + i % chats
+        updates.append({
+            "update_id": i + 1,
+            "message": {
+                "message_id": i + 1,
+                "date": 1760000000,
+                "chat": {"id": chat_id, "type": "private"},
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Test"},
+                "text": str(i)
+            }
+        })
+    return updates
+
+
+# Stand-in for Telegram Bot API: serves updates to getUpdates, every response takes "rtt" seconds
+def fake_api(updates: list[dict], rtt: float) -> web.Application:
+    async def handle(request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = await request.post()
+        await asyncio.sleep(rtt)
+
+        if method == "getMe":
+            result = {"id": 42, "is_bot": True, "first_name": "Benchmark", "username": "benchmark_bot"}
+        elif method == "getUpdates":
+            offset = int(params.get("offset", 0))
+            limit = int(params.get("limit", 100))
+            result = [update for update in updates[max(offset - 1, 0):max(offset - 1, 0) + limit]]
+        else:
+            result = True
+        return web.json_response({"ok": True, "result": result})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", handle)
+    return app
+
+
+def create_dispatcher(work: float, expected: int) -> tuple[Dispatcher, dict, asyncio.Event]:
+    dp = Dispatcher()
+    handled = {}
+    done = asyncio.Event()
+
+    @dp.message()
+    async def on_message(message: Message):
+        await asyncio.sleep(random.uniform(0.5, 1.5) * work)
+        handled.setdefault(message.chat.id, []).append(int(message.text))
+        if sum(map(len, handled.values())) == expected:
+            done.set()
+
+    return dp, handled, done
+
+
+def in_order(handled: dict) -> bool:
+    return all(sequence == sorted(sequence) for sequence in handled.values())
+
+
+async def run_polling(args, api_url: str, updates: list[dict]) -> tuple[float, bool]:
+    dp, handled, done = create_dispatcher(args.work, len(updates))
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(api_url)))
+
+    start = time.perf_counter()
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=1,
+                                                   tasks_concurrency_limit=args.concurrency))
+    await done.wait()
+    elapsed = time.perf_counter() - start
+
+    await dp.stop_polling()
+    await polling
+    return elapsed, in_order(handled)
+
+
+async def run_webhook(args, api_url: str, updates: list[dict]) -> tuple[float, bool]:
+    dp, handled, done = create_dispatcher(args.work, len(updates))
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(api_url)))
+    processor = UpdateProcessor(dp, bot, concurrency=args.concurrency)
+
+    port = free_port()
+    runner = web.AppRunner(create_webhook_app(dp, bot, processor, path="/webhook", secret="benchmark"))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+
+    # Telegram delivers updates over up to "max_connections" parallel requests, each one in order
+    queue = asyncio.Queue()
+    for update in updates:
+        queue.put_nowait(update)
+
+    async def connection(session: ClientSession):
+        while not queue.empty():
+            update = queue.get_nowait()
+            await asyncio.sleep(args.rtt / 2)
+            async with session.post(f"http://127.0.0.1:{port}/webhook", json=update,
+                                    headers={"X-Telegram-Bot-Api-Secret-Token": "benchmark"}) as response:
+                assert response.status == 200
+
+    start = time.perf_counter()
+    async with ClientSession() as session:
+        await asyncio.gather(*(connection(session) for _ in range(args.connections)))
+    await done.wait()
+    elapsed = time.perf_counter() - start
+
+    await runner.cleanup()
+    await bot.session.close()
+    return elapsed, in_order(handled)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--work", type=float, default=0.02, help="average handler time per update, seconds")
+    parser.add_argument("--rtt", type=float, default=0.05, help="round trip to Telegram, seconds")
+    parser.add_argument("--concurrency", type=int, default=32, help="updates handled at the same time")
+    parser.add_argument("--connections", type=int, default=40, help="parallel webhook requests from Telegram")
+    args = parser.parse_args()
+
+    updates = synthetic_updates(args.updates, args.chats)
+
+    api_port = free_port()
+    api_runner = web.AppRunner(fake_api(updates, args.rtt))
+    await api_runner.setup()
+    await web.TCPSite(api_runner, "127.0.0.1", api_port).start()
+    api_url = f"http://127.0.0.1:{api_port}"
+
+    try:
+        for title, run in (("polling", run_polling), ("webhook", run_webhook)):
+            elapsed, ordered = await run(args, api_url, updates)
+            print(f"{title:>8}: {args.updates} updates in {elapsed:.2f}s ({args.updates / elapsed:.0f}/s) | "
+                  f"per-chat order {'kept' if ordered else 'BROKEN'}")
+    finally:
+        await api_runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
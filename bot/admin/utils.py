@@ -1,16 +1,35 @@
 from config import config
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Alignment
-from openpyxl.worksheet.table import Table, TableStyleInfo
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
 from uuid import uuid4
+from datetime import datetime, UTC, timedelta
 import os
-from database.utils import get_all_records_n_days
+import warnings
+from database.utils import get_records_export_summary, stream_records_export
+
+
+EXPORT_HEADERS = ["№ записи", "ФИО", "Тип пользователя", "Telegram", "Email", "Здание", "Аудитория", "Дата", "Временной слот"]
+CENTERED = Alignment(horizontal="center")
+
+
+# Cell with HYPERLINK formula (plain cell hyperlinks are kept in memory until the file is saved)
+def hyperlink(target: str, text: str) -> str:
+    target = target.replace('"', '""')
+    text = text.replace('"', '""')
+    return f'=HYPERLINK("{target}", "{text}")'
 
 
 # Export records for specified days to .xlsx file
 async def export_database() -> str | None:
     """
-    Creates temporary .xlsx file with last one-week data from records table
+    Creates temporary .xlsx file with last one-week data from records table.
+
+    Records are streamed from database into write-only workbook, so memory use does not depend on
+    number of records. Column widths are taken from the longest values in database before writing rows
+    (write-only sheet saves them before the first row).
 
     Returns:
         (str | None): File name or "None" if failed to create file
@@ -21,79 +40,85 @@ async def export_database() -> str | None:
         temp_path = os.path.join(current_directory, "bot", "admin", "temp")
         os.makedirs(temp_path, exist_ok=True)
 
-        # Load records from database
-        loaded_data = await get_all_records_n_days()
-
-        # Convert data to list with items
-        converted_data = [
-            ["№ записи", "ФИО", "Тип пользователя", "Telegram", "Телефон", "Email", "Здание", "Аудитория", "Дата", "Временной слот"]
-        ]
-        for item in loaded_data:
-            converted_data.append(
-                [
-                    item.id,
-                    item.user.full_name,
-                    item.user.user_type,
-                    f"https://t.me/{item.user.username}" if item.user.username else f"tg://user?id={item.user.telegram_id}",
-                    item.user.phone,
-                    item.user.email,
-                    item.building,
-                    item.room,
-                    item.date,
-                    f"{item.time_slot_start.strftime("%H:%M")}-{item.time_slot_end.strftime("%H:%M")}"
-                ]
-            )
+        start_date = (datetime.now(UTC) + timedelta(hours=config.TIMEZONE, days=-1 * config.DAYS_TO_LOAD_FROM_DB)).date()
+        summary = await get_records_export_summary(start_date)
 
         # Create workbook
-        wb = Workbook()
-        sheet = wb.active
+        wb = Workbook(write_only=True)
+        sheet = wb.create_sheet()
 
         # Generate worksheet title based on config.DAYS_TO_LOAD_FROM_DB
         sheet.title = await generate_worksheet_title(config.DAYS_TO_LOAD_FROM_DB)
 
-        # Add converted data to workbook
-        for row in converted_data:
-            sheet.append(row)
+        # Adjust width of columns based on the longest cell content
+        values_length = [
+            len(str(summary.id or "")),
+            summary.full_name or 0,
+            summary.user_type or 0,
+            len("https://t.me/") + (summary.telegram or 0),
+            summary.email or 0,
+            summary.building or 0,
+            summary.room or 0,
+            len("DD.MM.YYYY"),
+            len("00:00-00:00")
+        ]
+        for i, (header, value_length) in enumerate(zip(EXPORT_HEADERS, values_length), start=1):
+            sheet.column_dimensions[get_column_letter(i)].width = max(len(header), value_length) + 2
 
-        # Creating style for new table
-        style = TableStyleInfo(
-            name="TableStyleMedium9", showFirstColumn=False,
-            showLastColumn=False, showRowStripes=True, showColumnStripes=False
-        )
+        sheet.append(EXPORT_HEADERS)
 
-        # Creating new table for data
-        table = Table(displayName="Записи", ref=f"A1:J{len(converted_data)}", tableStyleInfo=style)
+        rows_count = 1
+        async for item in stream_records_export(start_date):
+            record_id = WriteOnlyCell(sheet, value=item.id)
+            record_id.alignment = CENTERED
 
-        # Adding table to the sheet
-        sheet.add_table(table)
+            telegram = f"https://t.me/{item.username}" if item.username else f"tg://user?id={item.telegram_id}"
+            email = hyperlink(f"mailto:{item.email}", item.email) if item.email else None
 
-        # Adjust width of columns
-        for column in sheet.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for i, cell in enumerate(column):
-                if i != 0:
-                    # Formatting dates
-                    if column_letter == "I":
-                        cell.number_format = "DD.MM.YYYY"
+            room = WriteOnlyCell(sheet, value=item.room)
+            room.alignment = CENTERED
 
-                    if column_letter == "D":
-                        cell.hyperlink = cell.value
+            # Formatting dates
+            record_date = WriteOnlyCell(sheet, value=item.date)
+            record_date.number_format = "DD.MM.YYYY"
+            record_date.alignment = CENTERED
 
-                    if column_letter == "F":
-                        cell.hyperlink = f"mailto:{cell.value}"
+            time_slot = WriteOnlyCell(
+                sheet, value=f"{item.time_slot_start.strftime("%H:%M")}-{item.time_slot_end.strftime("%H:%M")}"
+            )
+            time_slot.alignment = CENTERED
+
+            sheet.append([
+                record_id,
+                item.full_name,
+                item.user_type,
+                hyperlink(telegram, telegram),
+                email,
+                item.building,
+                room,
+                record_date,
+                time_slot
+            ])
+            rows_count += 1
 
-                    if column_letter in ["H", "I", "J", "A"]:
-                        cell.alignment = Alignment(horizontal="center")
+        # Creating style for new table
+        style = TableStyleInfo(
+            name="TableStyleMedium9", showFirstColumn=False,
+            showLastColumn=False, showRowStripes=True, showColumnStripes=False
+        )
 
-                # Updating max_length
-                if cell.value:
-                    cell_length = len(str(cell.value))
-                    if cell_length > max_length:
-                        max_length = cell_length
+        # Creating new table for data (headers are given, write-only sheet can not be read back)
+        table = Table(
+            displayName="Записи",
+            ref=f"A1:{get_column_letter(len(EXPORT_HEADERS))}{rows_count}",
+            tableStyleInfo=style,
+            tableColumns=[TableColumn(id=i, name=header) for i, header in enumerate(EXPORT_HEADERS, start=1)]
+        )
 
-            # Adjust column width based on the longest cell content
-            sheet.column_dimensions[column_letter].width = max_length + 2
+        # Adding table to the sheet (columns are set above, so write-only warning about them does not apply)
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="In write-only mode you must add table columns manually")
+            sheet.add_table(table)
 
         # Create temporary .xlsx file by saving file
         temp_file_name = f"{str(uuid4())}.xlsx"
@@ -5,24 +5,45 @@ from aiogram import Bot, Dispatcher
 from config import config
 
 from bot.handlers import profile, place, timepick
+from bot.middlewares import DbSessionMiddleware
+from bot.notifications import NOTIFICATIONS
+from bot.storage import create_storage
+from bot.webhook import start_webhook
+from database.database import init_models
+from email_ver.email_service import EMAIL_SERVICE
 
 
-# Bot polling function
+# Bot function: polling or webhook server (config.BOT_MODE)
 async def bot_main():
     # Logging level
     logging.basicConfig(
         level=logging.getLevelName(level=logging.INFO),
         format="[%(asctime)s] - [%(levelname)s] - %(name)s - %(message)s"
     )
+    # Create missing tables and indexes (fails if unique slot index can not be created)
+    await init_models()
+
     # Инициализируем бот и диспетчер
     bot = Bot(token=config.TELEGRAM_TOKEN)
-    dp = Dispatcher()
+    dp = Dispatcher(storage=create_storage())
+
+    # One database session per update for all handlers
+    dp.update.outer_middleware(DbSessionMiddleware())
 
     # Registering routers
     dp.include_router(profile.router)
     dp.include_router(place.router)
     dp.include_router(timepick.router)
 
+    # Deliver queued emails and close SMTP connections on shutdown
+    dp.shutdown.register(EMAIL_SERVICE.stop)
+    # Send queued report chat notifications on shutdown
+    dp.shutdown.register(NOTIFICATIONS.stop)
+
+    if config.BOT_MODE == "webhook":
+        await start_webhook(dp, bot)
+        return
+
     # Skipping updates and running polling
     await bot.delete_webhook(drop_pending_updates=True)
     logging.info("Webhook deleted")
@@ -1,6 +1,3 @@
-import copy
-import random
-
 from aiogram import Router, F
 from aiogram.exceptions import DetailedAiogramError
 from aiogram.types import CallbackQuery, Message
@@ -145,21 +142,21 @@ async def capacity_room_selection_type_handler(cq: CallbackQuery, state: FSMCont
     capacity_range = data.get("capacity_range")
 
     if selection_type == "any_room":
-        # Find random room matching capacity
-        matching_rooms = await SCHEDULE_SHARED.get_rooms_by_capacity(building_code, capacity_range)
+        # Find best fitting room matching capacity that has free slots
+        matching_rooms = await SCHEDULE_SHARED.search_rooms(building_code, capacity_range)
         if matching_rooms:
-            random_room = random.choice(matching_rooms)
-            await state.update_data(place_room=random_room.room_number)
+            found_room = matching_rooms[0]
+            await state.update_data(place_room=found_room.room_number)
 
             # Show room details and proceed to time selection
-            room_details = await get_room_details_text(random_room)
+            room_details = await get_room_details_text(found_room)
             await cq.message.edit_text(
-                text=f"🎲 Случайно выбрана аудитория:\n\n{room_details}",
+                text=f"🎲 Подобрана свободная аудитория:\n\n{room_details}",
                 reply_markup=await confirm_place_kb()
             )
         else:
             await cq.message.edit_text(
-                text="❌ Не найдено аудиторий с выбранной вместимостью. Попробуйте другой вариант.",
+                text="❌ Не найдено свободных аудиторий с выбранной вместимостью. Попробуйте другой вариант.",
                 reply_markup=await capacity_room_selection_type_kb()
             )
             await cq.answer("Аудитории не найдены")
@@ -352,20 +349,10 @@ async def place_ok(cq: CallbackQuery, state: FSMContext):
 
     # Use dates directly from the room object in SHARED_SCHEDULE
     # These are already the latest and include both schedule and database bookings
-    final_date_required = []
-
-    for room_date in room_obj.dates:
-        # Create a copy of the date object
-        date_copy = copy.copy(room_date)
-
-        # Filter only free time slots
-        date_copy.time_slots = [copy.copy(slot) for slot in room_date.time_slots if slot.status.is_free]
-
-        # Only include dates that have available time slots
-        if date_copy.time_slots:
-            final_date_required.append(date_copy)
+    # Only include dates that have available time slots
+    final_date_required = room_obj.dates_with_slots(free_only=True)
 
-    await state.update_data(dates_required=final_date_required)
+    await state.update_data(dates_required=[date_cell.date.isoformat() for date_cell in final_date_required])
 
     # Check if any dates have available slots
     if not final_date_required:
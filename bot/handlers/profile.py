@@ -4,6 +4,7 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.filters import CommandStart, Command
 from aiogram.fsm.state import StatesGroup, State
 from aiogram.fsm.context import FSMContext
+from sqlalchemy.ext.asyncio import AsyncSession
 from database.utils import get_user, update_user, create_user, delete_user
 from bot.keyboards import status_kb, confirm_inline_kb, edit_menu_kb, profile_kb, main_menu_kb, resend_code_kb
 from bot.utils import (main_form, map_user_type, ensure_form_msg, delete_prompt_if_any,
@@ -24,11 +25,11 @@ class UserState(StatesGroup):
 
 # handler for /start command
 @router.message(CommandStart())
-async def cmd_start(m: Message, state: FSMContext):
+async def cmd_start(m: Message, state: FSMContext, session: AsyncSession):
     await state.clear()
 
     # check if user already exist
-    user = await get_user(m.from_user.id)
+    user = await get_user(m.from_user.id, session=session)
 
     if user:
         await m.answer(
@@ -53,7 +54,7 @@ async def cmd_start(m: Message, state: FSMContext):
 
 # handler for callback query after selection of user_type (prefix st:)
 @router.callback_query(UserState.user_type, F.data.startswith("st:"))
-async def choose_status(cq: CallbackQuery, state: FSMContext):
+async def choose_status(cq: CallbackQuery, state: FSMContext, session: AsyncSession):
     # get value of user_type by key with prefix "st:"
     user_type = await map_user_type(cq.data)
     # update user_type in state
@@ -64,7 +65,7 @@ async def choose_status(cq: CallbackQuery, state: FSMContext):
     # if state data contains "profile_edit" key with value "user_type"
     # it means that it requires and update in database
     if data.get("profile_edit") == "user_type":
-        user = await update_user(cq.from_user.id, **{"user_type": user_type})
+        user = await update_user(cq.from_user.id, session=session, **{"user_type": user_type})
         await state.update_data(profile_edit=None)
 
         # deleting message that contained keyboard of current callback action
@@ -116,7 +117,7 @@ async def choose_status(cq: CallbackQuery, state: FSMContext):
 
 # handler of full name state
 @router.message(UserState.full_name)
-async def got_full_name(m: Message, state: FSMContext):
+async def got_full_name(m: Message, state: FSMContext, session: AsyncSession):
     txt = m.text.strip()
 
     # if full name length is less than 5 characters
@@ -137,7 +138,7 @@ async def got_full_name(m: Message, state: FSMContext):
         data = await state.get_data()
 
         if data.get("profile_edit") == "full_name":
-            await update_user(m.from_user.id, **{"full_name": txt})
+            user = await update_user(m.from_user.id, session=session, **{"full_name": txt})
             await state.update_data(profile_edit=None)
             await delete_prompt_if_any(state, m)
 
@@ -147,7 +148,6 @@ async def got_full_name(m: Message, state: FSMContext):
             except DetailedAiogramError as e:
                 print(e)
 
-            user = await get_user(m.from_user.id)
             await m.bot.send_message(
                 m.chat.id,
                 f"ФИО обновлено ✅\n\nВаш профиль:\n• Статус: {user.user_type}\n• ФИО: {user.full_name}\n• Почта: {user.email}",
@@ -269,7 +269,7 @@ async def got_full_name(m: Message, state: FSMContext):
 
 # handler of email
 @router.message(UserState.email)
-async def got_email(m: Message, state: FSMContext):
+async def got_email(m: Message, state: FSMContext, session: AsyncSession):
     print(f"Entered email field from {m.text}")
     txt = m.text.strip()
 
@@ -286,7 +286,7 @@ async def got_email(m: Message, state: FSMContext):
         if data.get("user_type"):
             accepted_domain = "@edu.hse.ru" if data.get("user_type") == "Студент" else "@hse.ru"
         else:
-            user = await get_user(m.from_user.id)
+            user = await get_user(m.from_user.id, session=session)
             accepted_domain = "@edu.hse.ru" if user.user_type == "Студент" else "@hse.ru"
 
         prompt = await m.bot.send_message(m.chat.id, f"Почта некорректна!\nДопустимый домен: {accepted_domain}")
@@ -310,12 +310,12 @@ async def send_verification_code(m: Message, state: FSMContext, email: str):
     # Generate and send verification code
     data = await state.get_data()
     email_obj = Email(email, data.get("full_name"))
-    await email_obj.send_email()
+    delivered = await email_obj.send_email()
 
     # Store verification data
     await state.update_data(
         email_verification_code=email_obj.code,
-        email_verification_sent=datetime.now(UTC)
+        email_verification_sent=datetime.now(UTC).timestamp()
     )
 
     # Delete prompt if any
@@ -331,7 +331,9 @@ async def send_verification_code(m: Message, state: FSMContext, email: str):
 
     # Different message based on context
     data = await state.get_data()
-    if data.get("profile_edit") == "email":
+    if not delivered:
+        message_text = f"❌ Не удалось отправить письмо на {email}. Попробуйте отправить код ещё раз или укажите другую почту."
+    elif data.get("profile_edit") == "email":
         message_text = f"📧 Код подтверждения отправлен на {email}\n\nВведите код из письма для подтверждения новой почты (действителен 15 минут):"
     else:
         message_text = f"📧 Код подтверждения отправлен на {email}\n\nВведите код из письма (действителен 15 минут):"
@@ -342,13 +344,13 @@ async def send_verification_code(m: Message, state: FSMContext, email: str):
 
 # handler for email verification code (updated)
 @router.message(UserState.email_code)
-async def verify_email_code(m: Message, state: FSMContext):
+async def verify_email_code(m: Message, state: FSMContext, session: AsyncSession):
     entered_code = m.text.strip()
     data = await state.get_data()
 
     # Check if code has expired (15 minutes)
     verification_sent = data.get("email_verification_sent")
-    if verification_sent and (datetime.now(UTC) - verification_sent).total_seconds() > 900:  # 15 minutes
+    if verification_sent and datetime.now(UTC).timestamp() - verification_sent > 900:  # 15 minutes
         await delete_prompt_if_any(state, m)
         try:
             await m.delete()
@@ -375,7 +377,8 @@ async def verify_email_code(m: Message, state: FSMContext):
         # Handle based on context (new registration or editing)
         if data.get("profile_edit") == "email":
             # Update email in database
-            await update_user(m.from_user.id, **{"email": data.get("email"), "email_verified": True})
+            user = await update_user(m.from_user.id, session=session,
+                                     **{"email": data.get("email"), "email_verified": True})
             await state.update_data(profile_edit=None)
 
             try:
@@ -383,7 +386,6 @@ async def verify_email_code(m: Message, state: FSMContext):
             except DetailedAiogramError as e:
                 print(e)
 
-            user = await get_user(m.from_user.id)
             await m.answer(
                 f"✅ Почта подтверждена и обновлена!\n\nВаш профиль:\n"
                 f"• Статус: {user.user_type}\n• ФИО: {user.full_name}\n• Почта: {user.email}",
@@ -449,12 +451,14 @@ async def resend_verification_code(cq: CallbackQuery, state: FSMContext):
     if email:
         # Send new verification code
         email_obj = Email(email)
-        await email_obj.send_email()
+        if not await email_obj.send_email():
+            await cq.answer("❌ Не удалось отправить письмо, попробуйте позже", show_alert=True)
+            return
 
         # Update verification data with new code and timestamp
         await state.update_data(
             email_verification_code=email_obj.code,
-            email_verification_sent=datetime.now(UTC)
+            email_verification_sent=datetime.now(UTC).timestamp()
         )
 
         await cq.answer("✅ Новый код отправлен на вашу почту!")
@@ -522,7 +526,7 @@ async def change_field(cq: CallbackQuery, state: FSMContext):
 
 # handler if all entered data is correct and approved by user
 @router.callback_query(F.data == "ok")
-async def confirm_ok(cq: CallbackQuery, state: FSMContext):
+async def confirm_ok(cq: CallbackQuery, state: FSMContext, session: AsyncSession):
     data = await state.get_data()
 
     # Check if email is verified
@@ -548,7 +552,8 @@ async def confirm_ok(cq: CallbackQuery, state: FSMContext):
             data["full_name"],
             cq.from_user.username,
             data["email"],
-            data["user_type"]
+            data["user_type"],
+            session=session
         )
 
         form_msg_id = data.get("form_msg_id")
@@ -571,14 +576,14 @@ async def confirm_ok(cq: CallbackQuery, state: FSMContext):
 
 # handler to edit data in state
 @router.callback_query(F.data.startswith("edit:"))
-async def edit_profile(cq: CallbackQuery, state: FSMContext):
+async def edit_profile(cq: CallbackQuery, state: FSMContext, session: AsyncSession):
     action = cq.data.split(":", 1)[1]
     uid = cq.from_user.id
 
     await delete_prompt_if_any(state, cq.message)
 
     if action == "reset":
-        await delete_user(uid)
+        await delete_user(uid, session=session)
         await state.clear()
         try:
             await cq.message.edit_text("Профиль удалён. Нажмите /start для повторной регистрации.")
@@ -620,7 +625,7 @@ async def edit_profile(cq: CallbackQuery, state: FSMContext):
             await state.update_data(prompt_msg_id=prompt.message_id)
 
         elif action == "back":
-            user = await get_user(uid)
+            user = await get_user(uid, session=session)
 
             # deleting message that contained keyboard of current callback action
             try:
@@ -637,8 +642,8 @@ async def edit_profile(cq: CallbackQuery, state: FSMContext):
 
 # handler to show profile buttons
 @router.message(F.text == "ℹ️ Профиль")
-async def show_profile_btn(m: Message):
-    user = await get_user(m.from_user.id)
+async def show_profile_btn(m: Message, session: AsyncSession):
+    user = await get_user(m.from_user.id, session=session)
     if not user:
         await m.answer("Профиль не найден. Нажмите /start для регистрации.")
     else:
@@ -650,8 +655,8 @@ async def show_profile_btn(m: Message):
 
 # handler of profile command
 @router.message(Command("profile"))
-async def show_profile_cmd(m: Message):
-    await show_profile_btn(m)
+async def show_profile_cmd(m: Message, session: AsyncSession):
+    await show_profile_btn(m, session)
 
 @router.message(Command("cancel"))
 async def cmd_cancel(m: Message, state: FSMContext):
@@ -1,15 +1,18 @@
-import copy
+from datetime import date
 
 from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.exceptions import DetailedAiogramError
 from aiogram.types import CallbackQuery, Message
 from aiogram.fsm.context import FSMContext
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from bot.utils import (render_time_card, send_booking_notification,
-                       ensure_time_msg, kill_sticky_message)
+                       ensure_time_msg, kill_sticky_message, slot_text)
 from aiogram.fsm.state import StatesGroup, State
 from bot.keyboards import day_kb, timeslots_kb, confirm_time_kb, main_menu_kb
-from database.utils import get_records_by_building_room_date, is_room_recorded, create_record
+from database.utils import get_records_by_building_room_date, book_slot, get_user
+from google.schedule import DateCell, TimeSlot, TIME_SLOTS
 from shared_data import SCHEDULE_SHARED
 
 router = Router()
@@ -26,6 +29,16 @@ async def time_start_cmd(m: Message, state: FSMContext):
     await start_time_stage(m, state)
 
 
+# Date cells of the room in shared schedule for ISO dates kept in FSM data
+async def resolve_dates(data: dict) -> list[DateCell]:
+    room_obj = await SCHEDULE_SHARED.get_room_by_number(data.get("place_building_code"), data.get("place_room"))
+    if not room_obj:
+        return []
+
+    date_cells = [room_obj.get_date(iso_date) for iso_date in data.get("dates_required") or []]
+    return [date_cell for date_cell in date_cells if date_cell is not None]
+
+
 @router.callback_query(TimePick.day, F.data.startswith("day:"))
 async def pick_day(cq: CallbackQuery, state: FSMContext):
     key = cq.data.split(":", 1)[1]
@@ -41,25 +54,15 @@ async def pick_day(cq: CallbackQuery, state: FSMContext):
         await cq.answer("❌ Ошибка: аудитория не найдена", show_alert=True)
         return
 
-    # Find the date object in the room's schedule
-    selected_date_obj = None
-    for room_date in room_obj.dates:
-        if room_date.weekday == key:
-            selected_date_obj = copy.copy(room_date)
-            break
+    # Find the date object in the room's schedule (shared, only read)
+    selected_date_obj = room_obj.get_date(key)
 
     if selected_date_obj:
-        # Keep ALL time slots (both free and booked) but mark them appropriately
-        # The timeslots_kb will handle displaying booked slots with icons
-        processed_slots = []
-        for slot in selected_date_obj.time_slots:
-            slot_copy = copy.copy(slot)
-            processed_slots.append(slot_copy)
-
-        selected_date_obj.time_slots = processed_slots
-
+        # ALL time slots (both free and booked) are shown,
+        # the timeslots_kb will handle displaying booked slots with icons
         await state.update_data(
-            selected_date=selected_date_obj,
+            time_date_iso=key,
+            time_slot_index=None,
             time_day=selected_date_obj.weekday,
             time_date=selected_date_obj.date.strftime("%d.%m.%Y")
         )
@@ -92,15 +95,21 @@ async def pick_slot(cq: CallbackQuery, state: FSMContext):
     if action == "back":
         await cq.message.edit_text(
             text=await render_time_card(await state.get_data(), review=False),
-            reply_markup=await day_kb(state_data.get("dates_required"))
+            reply_markup=await day_kb(await resolve_dates(state_data))
         )
         await state.set_state(TimePick.day)
         await cq.answer()
         return
 
+    # Selected date of the room in shared schedule
+    room_obj = await SCHEDULE_SHARED.get_room_by_number(state_data.get("place_building_code"), state_data.get("place_room"))
+    selected_date = room_obj.get_date(state_data.get("time_date_iso") or "") if room_obj else None
+    if selected_date is None:
+        await cq.answer("День не найден", show_alert=True)
+        return
+
     if action == "any":
         # Find first available slot (only free ones)
-        selected_date = state_data.get("selected_date")
         available_slots = [slot for slot in selected_date.time_slots if slot.status.is_free]
         if available_slots:
             selected_slot = available_slots[0]
@@ -109,24 +118,17 @@ async def pick_slot(cq: CallbackQuery, state: FSMContext):
             await cq.answer("❌ Нет доступных слотов на этот день. Выберите другой день.", show_alert=True)
             return
     else:
-        # Find the selected slot
-        slot_index = int(action) - 1
-        selected_date = state_data.get("selected_date")
-        if 0 <= slot_index < len(selected_date.time_slots):
-            selected_slot = selected_date.time_slots[slot_index]
-        else:
+        # Find the selected slot by its index in TIME_SLOTS
+        selected_slot = selected_date.get_time_slot(int(action)) if action.isdigit() else None
+        if selected_slot is None:
             await cq.answer("❌ Слот не найден", show_alert=True)
             return
 
     # Check if slot is available
     if selected_slot.status.is_free:
-        await state.update_data(time_slot=selected_slot)
+        await state.update_data(time_slot_index=selected_slot.index)
 
         # Get room details for confirmation
-        building_code = state_data.get("place_building_code")
-        room_number = state_data.get("place_room")
-        room_obj = await SCHEDULE_SHARED.get_room_by_number(building_code, room_number)
-
         room_info = ""
         if room_obj:
             room_info = f"\n📍 Аудитория: {room_obj.room_number} ({room_obj.room_type})"
@@ -165,59 +167,59 @@ async def time_redo(cq: CallbackQuery, state: FSMContext):
     room_obj = await SCHEDULE_SHARED.get_room_by_number(building_code, room_number)
 
     if room_obj:
-        # Create fresh dates_required with latest data (including both free and booked)
-        dates_required = []
-        for room_date in room_obj.dates:
-            date_copy = copy.copy(room_date)
-            # Include all slots (free and booked) for display
-            processed_slots = []
-            for slot in room_date.time_slots:
-                slot_copy = copy.copy(slot)
-                processed_slots.append(slot_copy)
-            date_copy.time_slots = processed_slots
-
-            # Only include dates that have any slots (free or booked)
-            if date_copy.time_slots:
-                dates_required.append(date_copy)
+        # Fresh dates_required with latest data, dates that have any slots (free or booked)
+        dates_required = room_obj.dates_with_slots()
 
-        await state.update_data(dates_required=dates_required)
+        await state.update_data(dates_required=[date_cell.date.isoformat() for date_cell in dates_required])
+    else:
+        dates_required = []
 
     await cq.message.edit_text(
-        text=await render_time_card(data, review=False),
-        reply_markup=await day_kb(data.get("dates_required"))
+        text=await render_time_card(await state.get_data(), review=False),
+        reply_markup=await day_kb(dates_required)
     )
     await state.set_state(TimePick.day)
     await cq.answer()
 
 
 @router.callback_query(F.data == "time:ok")
-async def time_ok(cq: CallbackQuery, state: FSMContext):
+async def time_ok(cq: CallbackQuery, state: FSMContext, session: AsyncSession):
     data = await state.get_data()
 
-    if not await is_room_recorded(
-            data.get("place_building_title"),
-            data.get("place_room"),
-            data.get("selected_date").date,
-            data.get("time_slot").start,
-            data.get("time_slot").end
-    ):
-
-        # Create booking record
-        await create_record(
-            cq.message.from_user.id,
+    if not data.get("time_date_iso") or data.get("time_slot_index") is None:
+        await cq.answer("❌ Выберите день и время заново", show_alert=True)
+        return
+
+    selected_date = date.fromisoformat(data.get("time_date_iso"))
+    slot_times = TIME_SLOTS[data.get("time_slot_index")]
+    time_slot = TimeSlot(slot_times["start"], slot_times["end"])
+
+    # Create booking record, "None" if someone has already booked the slot
+    try:
+        record = await book_slot(
+            cq.from_user.id,
             data.get("place_building_title"),
             data.get("place_room"),
-            data.get("selected_date").date,
-            data.get("time_slot").start,
-            data.get("time_slot").end
+            selected_date,
+            time_slot.start,
+            time_slot.end,
+            session=session
         )
+    except SQLAlchemyError:
+        # slot is not known to be taken, shared schedule stays as it is
+        await cq.answer("❌ Не удалось сохранить бронирование. Попробуйте ещё раз.", show_alert=True)
+        return
+
+    if record is not None:
+        # Booking is already committed by book_slot, stop the button spinner
+        await cq.answer()
 
         # Update shared schedule
         await SCHEDULE_SHARED.update_room_slot_status(
             data.get("place_building_code"),
             data.get("place_room"),
-            data.get("selected_date").date,
-            data.get("time_slot"),
+            selected_date,
+            time_slot,
             is_free=False,
             name=cq.from_user.full_name
         )
@@ -235,7 +237,7 @@ async def time_ok(cq: CallbackQuery, state: FSMContext):
             final_text = (f"✅ Бронирование подтверждено!\n\n"
                           f"• Корпус: {data.get('place_building_title')}{room_info}\n"
                           f"• День: {data.get('time_day')} ({data.get('time_date')})\n"
-                          f"• Время: {data.get('time_slot').__repr__()}\n\n"
+                          f"• Время: {slot_text(data.get('time_slot_index'))}\n\n"
                           f"Запись сохранена в системе.")
 
             await cq.message.edit_text(text=final_text)
@@ -244,20 +246,31 @@ async def time_ok(cq: CallbackQuery, state: FSMContext):
                 "Готово! Можно переходить к следующему шагу.",
                 reply_markup=await main_menu_kb()
             )
-
-            # Уведомление учебного отдела (с кликабельным ФИО)
-            await send_booking_notification(
-                cq.message.bot,
-                cq.from_user.id,
-                cq.from_user.full_name,
-                data,
-                cq.from_user.username
-            )
-            await cq.answer()
         except DetailedAiogramError as e:
             print(e)
 
+        # Уведомление учебного отдела (с кликабельным ФИО), sent in background
+        send_booking_notification(
+            cq.message.bot,
+            cq.from_user.id,
+            cq.from_user.full_name,
+            data,
+            cq.from_user.username,
+            user=await get_user(cq.from_user.id, session=session)
+        )
+
     else:
+        await cq.answer("❌ Слот уже занят")
+
+        # Shared schedule could still show the slot as free, card is rendered without it
+        await SCHEDULE_SHARED.update_room_slot_status(
+            data.get("place_building_code"),
+            data.get("place_room"),
+            selected_date,
+            time_slot,
+            is_free=False
+        )
+
         try:
             await cq.message.edit_text(
                 text=await render_time_card(data,
@@ -274,7 +287,7 @@ async def time_cancel(cq: CallbackQuery, state: FSMContext):
     except DetailedAiogramError as e:
         print(e)
 
-    await state.update_data(time_day=None, time_date=None, time_slot=None, time_msg_id=None)
+    await state.update_data(time_day=None, time_date=None, time_date_iso=None, time_slot_index=None, time_msg_id=None)
     await cq.message.answer("Выбор времени отменён.", reply_markup=await main_menu_kb())
     await cq.answer()
 
@@ -289,24 +302,13 @@ async def start_time_stage(msg: Message, state: FSMContext):
     room_number = data.get("place_room")
     room_obj = await SCHEDULE_SHARED.get_room_by_number(building_code, room_number)
 
-    dates_required = []
-    if room_obj:
-        for room_date in room_obj.dates:
-            date_copy = copy.copy(room_date)
-            # Include all time slots (both free and booked) for display
-            processed_slots = []
-            for slot in room_date.time_slots:
-                slot_copy = copy.copy(slot)
-                processed_slots.append(slot_copy)
-            date_copy.time_slots = processed_slots
-
-            # Only include dates that have any slots
-            if date_copy.time_slots:
-                dates_required.append(date_copy)
-
-        await state.update_data(dates_required=dates_required)
-
-    await state.update_data(time_day=None, time_date=None, time_slot=None)
+    # Dates that have any slots (both free and booked are shown)
+    dates_required = room_obj.dates_with_slots() if room_obj else []
+
+    await state.update_data(
+        dates_required=[date_cell.date.isoformat() for date_cell in dates_required],
+        time_day=None, time_date=None, time_date_iso=None, time_slot_index=None
+    )
 
     # Get room details for the message
     room_info = ""
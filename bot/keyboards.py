@@ -132,7 +132,7 @@ async def day_kb(dates_required) -> InlineKeyboardMarkup:
 
     for date_obj in dates_required:
         rows.append([
-            InlineKeyboardButton(text=f"{date_obj.weekday} ({date_obj.date_to_str()})", callback_data=f"day:{date_obj.weekday}"),
+            InlineKeyboardButton(text=f"{date_obj.weekday} ({date_obj.date_to_str()})", callback_data=f"day:{date_obj.date.isoformat()}"),
         ])
     rows.extend([
         [InlineKeyboardButton(text="Отмена", callback_data="time:cancel")]
@@ -168,12 +168,13 @@ async def timeslots_kb(time_slots: list[TimeSlot]) -> InlineKeyboardMarkup:
         free_slots = [slot for slot in time_slots if slot.status.is_free]
         if free_slots:
             random_pos = random.randint(0, len(free_slots) - 1)
-            random_slot_index = time_slots.index(free_slots[random_pos]) + 1
+            random_slot_index = free_slots[random_pos].index
         else:
             random_slot_index = 0
 
-        for index, slot in enumerate(time_slots):
-            slot_id = index + 1
+        for slot in time_slots:
+            # position of the slot in TIME_SLOTS, stays the same when passed slots are dropped
+            slot_id = slot.index
             slot_str = slot.__repr__()
 
             # Add icon based on availability
@@ -0,0 +1,32 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from database.database import async_session_maker
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """
+    One database session per update.
+
+    Session is passed to handlers as "session" argument. Database helpers end its transaction as soon as
+    they are done (no locks are held while the handler waits for Telegram), changes made by the handler
+    itself are committed after it or rolled back if it fails. Connection is taken from the pool only when
+    the first query is made, so updates without database work do not use it.
+    """
+    def __init__(self, session_maker=async_session_maker):
+        self.session_maker = session_maker
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any]
+    ) -> Any:
+        async with self.session_maker() as session:
+            data["session"] = session
+            result = await handler(event, data)
+            if session.in_transaction():
+                await session.commit()
+            return result
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+
+from aiogram import Bot
+from aiogram.enums import ParseMode
+from aiogram.exceptions import DetailedAiogramError, TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+
+from config import config
+
+
+# Telegram limit of message text length
+MESSAGE_LIMIT = 4096
+
+
+# Join notifications into digest messages, each one within Telegram message limit
+def build_digests(texts: list[str], separator: str = "\n\n") -> list[str]:
+    digests = []
+    current = ""
+    for text in texts:
+        text = text[:MESSAGE_LIMIT]
+        if current and len(current) + len(separator) + len(text) > MESSAGE_LIMIT:
+            digests.append(current)
+            current = ""
+        current = f"{current}{separator}{text}" if current else text
+    if current:
+        digests.append(current)
+    return digests
+
+
+class NotificationQueue:
+    """
+    Background delivery of notifications to the report chat.
+
+    Handlers put texts to the queue and do not wait for Telegram. The worker waits "digest_delay" seconds
+    after the first text of a burst, sends everything collected as one or several digest messages
+    and respects flood control (retry_after) of the chat.
+
+    Attributes:
+        chat_id (str): report chat id, notifications are dropped if it is not set.
+        digest_delay (float): seconds to collect notifications into one digest.
+        retries (int): number of attempts to send a digest on network or server errors.
+    """
+    def __init__(self, chat_id: str = config.TELEGRAM_REPORT_CHAT_ID,
+                 digest_delay: float = config.REPORT_DIGEST_DELAY, retries: int = 3):
+        self.chat_id = chat_id
+        self.digest_delay = digest_delay
+        self.retries = retries
+
+        self.bot = None
+        self.queue = None
+        self.worker_task = None
+
+    def start(self):
+        if self.worker_task is None:
+            self.queue = asyncio.Queue()
+            self.worker_task = asyncio.create_task(self.__worker())
+
+    async def stop(self):
+        """Send queued notifications, then stop worker"""
+        if self.worker_task is None:
+            return
+
+        await self.queue.join()
+        self.worker_task.cancel()
+        await asyncio.gather(self.worker_task, return_exceptions=True)
+        self.worker_task = None
+
+    def notify(self, bot: Bot, text: str):
+        if not self.chat_id:
+            return
+
+        self.bot = bot
+        self.start()
+        self.queue.put_nowait(text)
+
+    async def __worker(self):
+        while True:
+            texts = [await self.queue.get()]
+            try:
+                await asyncio.sleep(self.digest_delay)
+                while not self.queue.empty():
+                    texts.append(self.queue.get_nowait())
+
+                for digest in build_digests(texts):
+                    await self.__send(digest)
+            finally:
+                for _ in texts:
+                    self.queue.task_done()
+
+    async def __send(self, text: str):
+        attempt = 0
+        while attempt < self.retries:
+            try:
+                await self.bot.send_message(self.chat_id, text, parse_mode=ParseMode.HTML)
+                return
+            except TelegramRetryAfter as e:
+                # flood control does not count as a failed attempt
+                logging.warning(f"Report chat flood control, waiting {e.retry_after}s")
+                await asyncio.sleep(e.retry_after)
+            except (TelegramNetworkError, TelegramServerError) as e:
+                logging.warning(f"Booking notification failed (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(2 ** attempt)
+                attempt += 1
+            except DetailedAiogramError as e:
+                logging.warning(f"Не удалось отправить уведомление о бронировании: {e}")
+                return
+        logging.error(f"Booking notification was not sent after {self.retries} attempts")
+
+
+# global queue of report chat notifications
+NOTIFICATIONS = NotificationQueue()
@@ -0,0 +1,193 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional
+
+from aiogram.exceptions import DataNotDictLikeError
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import delete, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from config import config
+from database.database import async_session_maker, engine
+from database.models import FSMRecord
+
+
+class SQLAlchemyStorage(BaseStorage):
+    """
+    FSM storage in "fsm_states" table of the bot database.
+
+    Writes are coalesced: changed chats are kept in memory and saved in one transaction
+    "flush_delay" seconds after the first change (several update_data calls of one handler become one write).
+    Recently used chats are kept in a small read cache, so reads do not go to the database.
+
+    Cache and pending writes belong to the process, so several bot processes can share the table
+    as long as every chat is handled by one of them at a time.
+
+    Attributes:
+        flush_delay (float): seconds to wait before saving changed chats.
+        cache_size (int): number of chats kept in the read cache.
+    """
+    def __init__(self, session_maker=async_session_maker, key_builder: KeyBuilder = None,
+                 flush_delay: float = config.FSM_FLUSH_DELAY, cache_size: int = 1024):
+        self.session_maker = session_maker
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        self.flush_delay = flush_delay
+        self.cache_size = cache_size
+
+        self.cache = OrderedDict() # key -> [state, data], last used at the end
+        self.dirty = set() # keys changed but not saved yet
+        self.flushing = set() # keys being saved now (not evicted until saved)
+        self.failures = {} # key -> number of failed saves in a row
+        self.flush_task = None
+        self.flush_lock = asyncio.Lock() # one flush at a time, so older values never overwrite newer ones
+        self.table_ready = False
+
+    async def __ensure_table(self):
+        if not self.table_ready:
+            async with engine.begin() as conn:
+                await conn.run_sync(FSMRecord.__table__.create, checkfirst=True)
+            self.table_ready = True
+
+    async def __load(self, key: StorageKey) -> list:
+        db_key = self.key_builder.build(key)
+        record = self.cache.get(db_key)
+        if record is not None:
+            self.cache.move_to_end(db_key)
+            return record
+
+        await self.__ensure_table()
+        async with self.session_maker() as session:
+            row = (await session.execute(
+                select(FSMRecord.state, FSMRecord.data).where(FSMRecord.key == db_key)
+            )).one_or_none()
+
+        # record could have been changed while loading
+        record = self.cache.get(db_key)
+        if record is None:
+            record = [row.state, dict(row.data or {})] if row else [None, {}]
+            self.cache[db_key] = record
+            self.__evict()
+        return record
+
+    def __evict(self):
+        # unsaved records stay in cache until they are flushed, the last used one is kept too
+        for db_key in list(self.cache)[:-1]:
+            if len(self.cache) <= self.cache_size:
+                break
+            if db_key not in self.dirty and db_key not in self.flushing:
+                del self.cache[db_key]
+
+    async def __mark_dirty(self, key: StorageKey):
+        self.dirty.add(self.key_builder.build(key))
+        if self.flush_delay <= 0:
+            await self.flush()
+        elif self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self.__delayed_flush())
+
+    async def __delayed_flush(self):
+        await asyncio.sleep(self.flush_delay)
+        # changes made while saving schedule the next flush
+        self.flush_task = None
+        await self.flush()
+
+    # Save all changed chats in one transaction
+    async def flush(self):
+        async with self.flush_lock:
+            await self.__flush()
+        self.__evict()
+
+    async def __flush(self):
+        if not self.dirty:
+            return
+
+        # values are taken before the first await, later changes are saved by the next flush
+        db_keys, self.dirty = self.dirty, set()
+        records = {db_key: tuple(self.cache[db_key]) for db_key in db_keys}
+        self.flushing = db_keys
+        try:
+            await self.__ensure_table()
+            try:
+                await self.__save(records)
+            except SQLAlchemyError:
+                # find the chats that can not be saved, others are saved one by one
+                for db_key, record in records.items():
+                    try:
+                        await self.__save({db_key: record})
+                    except SQLAlchemyError as e:
+                        self.__save_failed(db_key, e)
+                    else:
+                        self.failures.pop(db_key, None)
+            else:
+                for db_key in db_keys:
+                    self.failures.pop(db_key, None)
+        except SQLAlchemyError as e:
+            logging.warning(f"FSM storage is not available, {len(db_keys)} chats will be saved later: {e}")
+            self.dirty |= db_keys
+        finally:
+            self.flushing = set()
+
+    async def __save(self, records: dict):
+        async with self.session_maker() as session:
+            async with session.begin():
+                for db_key, (state, data) in records.items():
+                    if state is None and not data:
+                        await session.execute(delete(FSMRecord).where(FSMRecord.key == db_key))
+                    else:
+                        await session.merge(FSMRecord(key=db_key, state=state, data=data))
+
+    def __save_failed(self, db_key: str, error: Exception):
+        # a chat that keeps failing is dropped, so it does not block other chats
+        self.failures[db_key] = self.failures.get(db_key, 0) + 1
+        if self.failures[db_key] >= 3:
+            logging.error(f"FSM state of {db_key} was not saved and is dropped: {error}")
+            self.failures.pop(db_key)
+        else:
+            logging.warning(f"FSM state of {db_key} was not saved, retrying with next flush: {error}")
+            self.dirty.add(db_key)
+            if self.flush_task is None or self.flush_task.done():
+                self.flush_task = asyncio.create_task(self.__delayed_flush())
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self.__load(key)
+        record[0] = state.state if isinstance(state, State) else state
+        await self.__mark_dirty(key)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self.__load(key))[0]
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise DataNotDictLikeError(
+                f"Data must be a dict or dict-like object, got {type(data).__name__}"
+            )
+
+        record = await self.__load(key)
+        record[1] = data.copy()
+        await self.__mark_dirty(key)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return (await self.__load(key))[1].copy()
+
+    async def close(self) -> None:
+        if self.flush_task is not None and not self.flush_task.done():
+            self.flush_task.cancel()
+        await self.flush()
+
+
+# FSM storage selected in config
+def create_storage() -> BaseStorage:
+    if config.FSM_STORAGE == "sqlalchemy":
+        return SQLAlchemyStorage()
+
+    if config.FSM_STORAGE == "redis":
+        try:
+            from aiogram.fsm.storage.redis import RedisStorage
+        except ImportError:
+            logging.warning("FSM_STORAGE=redis needs \"redis\" package, memory storage is used")
+            return MemoryStorage()
+        return RedisStorage.from_url(config.FSM_REDIS_URL)
+
+    return MemoryStorage()
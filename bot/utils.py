@@ -1,17 +1,18 @@
-import re, html, logging
+import re, html
 from datetime import datetime, date, timedelta, UTC
 from typing import Optional
 
 from aiogram.fsm.context import FSMContext
 from aiogram.exceptions import DetailedAiogramError
 
-from database.utils import get_user
+from database.utils import CachedUser
 from config import config
 from aiogram import Bot
 from aiogram.types import Message
-from aiogram.enums import ParseMode
 
 from database.models import User
+from shared_data import SCHEDULE_SHARED
+from bot.notifications import NOTIFICATIONS
 
 # =========== Profile handler utils ===========
 # main form text for new and existing users
@@ -165,12 +166,13 @@ async def ensure_time_msg(state: FSMContext, msg: Message, review: bool = False)
     await state.update_data(time_msg_id=new_msg.message_id)
     return new_msg.message_id
 
-async def send_booking_notification(bot: Bot, user_id: int, fallback_fullname: str, data: dict, username: Optional[str] = None):
+# Put booking notification to report chat queue (sent in background as a part of digest)
+def send_booking_notification(bot: Bot, user_id: int, fallback_fullname: str, data: dict,
+                              username: Optional[str] = None, user: Optional[CachedUser] = None):
     if not config.TELEGRAM_REPORT_CHAT_ID:
         return
-    user = await get_user(user_id)
-    status = user.user_type or data.get("user_type") or "Пользователь"
-    fio_raw = user.full_name or data.get("full_name") or fallback_fullname
+    status = (user.user_type if user else None) or data.get("user_type") or "Пользователь"
+    fio_raw = (user.full_name if user else None) or data.get("full_name") or fallback_fullname
 
     fio_escaped = html.escape(fio_raw)
     if username:
@@ -180,24 +182,30 @@ async def send_booking_notification(bot: Bot, user_id: int, fallback_fullname: s
 
     bld      = data.get("place_building_title") or "—"
     room     = data.get("place_room")
-    date_str = data.get("selected_date").date.strftime("%d.%m.%Y")
+    date_str = data.get("time_date") or "—"
 
     room_txt = f"аудиторию № {room}" if str(room).isdigit() else f"аудиторию {room}"
 
-    time_txt = data.get("time_slot").__repr__() or "на указанную пару"
+    time_txt = slot_text(data.get("time_slot_index")) or "на указанную пару"
 
     text = (
         f"{status} {name_html} забронировал(а) в корпусе по адресу {bld} свободную {room_txt}, "
         f"{date_str}, {time_txt}."
     )
-    try:
-        await bot.send_message(config.TELEGRAM_REPORT_CHAT_ID, text, parse_mode=ParseMode.HTML)
-    except DetailedAiogramError as e:
-        print(e)
-        logging.warning(f"Не удалось отправить уведомление о бронировании: {e}")
+    NOTIFICATIONS.notify(bot, text)
 
 #===============================================
 
+# time slot text by its index in TIME_SLOTS (as kept in FSM data). Ex: "14:40-16:00"
+def slot_text(slot_index: Optional[int]) -> Optional[str]:
+    if slot_index is None:
+        return None
+    t = SLOT_TIMES.get(str(slot_index + 1))
+    if not t:
+        return None
+    return f"{t[0]}-{t[1]}"
+
+
 def slot_time_range_text(slot_code: Optional[str]) -> Optional[str]:
     if not slot_code:
         return None
@@ -220,18 +228,21 @@ async def render_time_card(data: dict, review: bool = False) -> str:
     elif date_str:
         day_line = date_str
 
-    if data.get("time_slot"):
-        slot_title = data.get("time_slot").__repr__()
-    else:
-        slot_title = "—"
+    slot_title = slot_text(data.get("time_slot_index")) or "—"
     base = (
         "🗓 Определение времени\n\n"
         f"• День: {day_line or '—'}\n"
         f"• Пара: {slot_title or '—'}\n\n"
     )
 
+    # Selected date of the room in shared schedule
+    date_cell = None
+    if data.get("time_date_iso"):
+        room_obj = await SCHEDULE_SHARED.get_room_by_number(data.get("place_building_code"), data.get("place_room"))
+        date_cell = room_obj.get_date(data.get("time_date_iso")) if room_obj else None
+
     # In case slots are empty
-    if data.get("selected_date") and not data.get("selected_date").time_slots:
+    if data.get("time_date_iso") and not (date_cell and date_cell.time_slots):
         tail = "Видимо свободных слотов на эту дату и время не осталось. Выберите другую дату или выберите другую аудиторию."
     elif not data.get("dates_required"):
         tail = "Видимо на ближайшие 3 дня в этой аудитории свободных слотов нет. Выберите другую аудиторию."
@@ -0,0 +1,136 @@
+import asyncio
+import hmac
+import logging
+from collections import deque
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.types import Update
+from aiogram.webhook.aiohttp_server import setup_application
+from aiohttp import web
+
+from config import config
+
+
+# Updates of one chat (or user, if update has no chat) are processed in the order they came
+def update_key(update: Update) -> int | None:
+    context = UserContextMiddleware.resolve_event_context(update)
+    if context.chat is not None:
+        return context.chat.id
+    if context.user is not None:
+        return context.user.id
+    return None
+
+
+class UpdateProcessor:
+    """
+    Processes updates in background tasks.
+
+    Every chat has its own queue drained by one task, so updates of one chat are handled one by one
+    in arrival order (FSM steps and double clicks do not race), while different chats run concurrently.
+
+    Attributes:
+        concurrency (int): number of updates handled at the same time.
+        max_pending (int): number of accepted but not finished updates, "feed" waits when it is reached
+            (webhook response is delayed and Telegram slows down).
+    """
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, concurrency: int = config.UPDATES_CONCURRENCY,
+                 max_pending: int | None = None, **kwargs):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.kwargs = kwargs
+        self.concurrency = concurrency
+        self.max_pending = max_pending or concurrency * 8
+
+        self.running = asyncio.Semaphore(self.concurrency)
+        self.pending = asyncio.Semaphore(self.max_pending)
+        self.chats = {} # chat id -> deque of updates waiting for chat task
+        self.tasks = set()
+
+    async def feed(self, update: Update):
+        await self.pending.acquire()
+
+        key = update_key(update)
+        if key is None:
+            key = ("update", update.update_id)
+
+        queue = self.chats.get(key)
+        if queue is not None:
+            queue.append(update)
+            return
+
+        self.chats[key] = deque([update])
+        task = asyncio.create_task(self.__drain(key))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def __drain(self, key):
+        queue = self.chats[key]
+        try:
+            while queue:
+                update = queue.popleft()
+                try:
+                    async with self.running:
+                        await self.dispatcher.feed_update(self.bot, update, **self.kwargs)
+                except Exception as e:
+                    logging.exception(f"Update {update.update_id} failed: {e}")
+                finally:
+                    self.pending.release()
+        finally:
+            del self.chats[key]
+
+    # Wait for accepted updates to be processed
+    async def close(self):
+        while self.tasks:
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+# aiohttp application receiving updates from Telegram
+def create_webhook_app(dispatcher: Dispatcher, bot: Bot, processor: UpdateProcessor,
+                       path: str = config.WEBHOOK_PATH, secret: str | None = config.WEBHOOK_SECRET) -> web.Application:
+    async def handle_update(request: web.Request) -> web.Response:
+        if secret and not hmac.compare_digest(request.headers.get("X-Telegram-Bot-Api-Secret-Token", ""), secret):
+            return web.Response(status=401)
+
+        update = Update.model_validate(await request.json(), context={"bot": bot})
+        await processor.feed(update)
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(path, handle_update)
+
+    # startup and shutdown handlers of dispatcher, pending updates are processed before shutdown
+    async def close_processor(app: web.Application):
+        await processor.close()
+
+    app.on_shutdown.append(close_processor)
+    setup_application(app, dispatcher, bot=bot)
+    return app
+
+
+# Run webhook server until it is stopped
+async def start_webhook(dispatcher: Dispatcher, bot: Bot):
+    if not config.WEBHOOK_URL:
+        raise ValueError("WEBHOOK_URL is required in webhook mode")
+
+    processor = UpdateProcessor(dispatcher, bot)
+    app = create_webhook_app(dispatcher, bot, processor)
+
+    await bot.set_webhook(
+        url=config.WEBHOOK_URL.rstrip("/") + config.WEBHOOK_PATH,
+        secret_token=config.WEBHOOK_SECRET,
+        allowed_updates=dispatcher.resolve_used_update_types(),
+        max_connections=min(config.UPDATES_CONCURRENCY, 100),
+        drop_pending_updates=True
+    )
+    logging.info(f"Webhook set, listening on {config.WEBHOOK_HOST}:{config.WEBHOOK_PORT}{config.WEBHOOK_PATH}")
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=config.WEBHOOK_HOST, port=config.WEBHOOK_PORT)
+    await site.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+        await bot.session.close()
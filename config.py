@@ -10,19 +10,38 @@ class Config:
         # Telegram Bot data
         self.TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
         self.TELEGRAM_REPORT_CHAT_ID = os.getenv("TELEGRAM_REPORT_CHAT_ID")
+        self.REPORT_DIGEST_DELAY = float(os.getenv("REPORT_DIGEST_DELAY", 3)) # seconds to collect booking notifications into one message
+
+        # Updates delivery: polling | webhook (aiohttp server behind HTTPS proxy at WEBHOOK_URL)
+        self.BOT_MODE = os.getenv("BOT_MODE", "polling")
+        self.WEBHOOK_URL = os.getenv("WEBHOOK_URL") # public base URL, e.g. https://bot.example.com
+        self.WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+        self.WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") # checked in X-Telegram-Bot-Api-Secret-Token header
+        self.WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+        self.WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", 8080))
+        self.UPDATES_CONCURRENCY = int(os.getenv("UPDATES_CONCURRENCY", 32)) # updates processed at the same time
+
+        # FSM storage: memory | sqlalchemy (tables of DB_URL) | redis (needs "redis" package)
+        self.FSM_STORAGE = os.getenv("FSM_STORAGE", "sqlalchemy")
+        self.FSM_REDIS_URL = os.getenv("FSM_REDIS_URL", "redis://localhost:6379/0")
+        self.FSM_FLUSH_DELAY = float(os.getenv("FSM_FLUSH_DELAY", 0.5)) # seconds to coalesce FSM writes before saving
 
         # Database URL
         self.DB_URL = os.getenv("DB_URL")
         self.DAYS_TO_LOAD_FROM_DB = int(os.getenv("DAYS_TO_LOAD_FROM_DB"))
+        self.USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 10000)) # users kept in memory
+        self.USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 600)) # seconds before cached user is read again
 
         # Google Spreadsheet API data
         self.GOOGLE_TABLE_URL = os.getenv("GOOGLE_TABLE_URL")
         self.GOOGLE_CREDENTIALS_PATH = os.getenv("GOOGLE_CREDENTIALS_PATH")
+        self.GOOGLE_REQUEST_TIMEOUT = int(os.getenv("GOOGLE_REQUEST_TIMEOUT", 30)) # seconds to wait for Google API response
 
         # Schedule variables
         self.DAYS_TO_SHOW = int(os.getenv("DAYS_TO_SHOW")) # for how many days ahead to load schedule
         self.TIMEZONE = int(os.getenv("TIMEZONE")) # desired location timezone
         self.SCHEDULE_UPDATE_INTERVAL = int(os.getenv("SCHEDULE_UPDATE_INTERVAL")) # update schedule every ??? minutes
+        self.SCHEDULE_CACHE_PATH = os.getenv("SCHEDULE_CACHE_PATH", "schedule_cache.pickle") # last loaded schedule for warm start (empty to disable)
         self.UPPER_WEEK_START_DATE = datetime.strptime(str(os.getenv("UPPER_WEEK_START_DATE")),"%d.%m.%Y").date() # current module upper week start date
 
         # Gmail - emailing variables
@@ -30,6 +49,7 @@ class Config:
         self.EMAIL_PASSWORD = os.getenv("EMAIL_PASSWORD")
         self.SMTP_SERVER = os.getenv("SMTP_SERVER")
         self.SMTP_PORT = int(os.getenv("SMTP_PORT"))
+        self.SMTP_POOL_SIZE = int(os.getenv("SMTP_POOL_SIZE", 2)) # number of persistent SMTP connections
 
     # update specific field in Config() object and .env file
     def update_attr(self, attribute_name: str, new_value: str):
@@ -1,17 +1,124 @@
+import logging
+from contextlib import asynccontextmanager
+
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, AsyncAttrs
-from sqlalchemy import func
+from sqlalchemy import and_, delete, event, func, inspect, select
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import sessionmaker, DeclarativeBase, Mapped, mapped_column
 from datetime import datetime
 from config import config
 
 engine = create_async_engine(config.DB_URL, echo=False)
+
+
+# pysqlite / aiosqlite start transactions on their own and commit them on SAVEPOINT,
+# so transactions are started by SQLAlchemy instead (savepoints of begin_nested work as expected).
+# WAL journal lets readers and a writer work at the same time
+def configure_sqlite(sqlite_engine):
+    @event.listens_for(sqlite_engine.sync_engine, "connect")
+    def disable_driver_transactions(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+    @event.listens_for(sqlite_engine.sync_engine, "begin")
+    def begin_transaction(connection):
+        connection.exec_driver_sql("BEGIN")
+
+
+if engine.dialect.name == "sqlite":
+    configure_sqlite(engine)
+
 async_session_maker = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+
+# Session of the current update (given by DbSessionMiddleware) or a new one for calls outside of handlers.
+# Transaction of the shared session is ended when the helper is done, so database locks are not held
+# while the handler waits for Telegram (commit, not rollback: loaded objects stay usable)
+@asynccontextmanager
+async def session_scope(session: AsyncSession | None = None):
+    if session is not None:
+        yield session
+        await session.commit()
+    else:
+        async with async_session_maker() as session:
+            yield session
+
+
+# Changes of a helper are committed when the helper is done, own session is rolled back on error.
+# In the shared session they are made in a savepoint, so a failed write is undone
+# without breaking the session for the rest of the update
+@asynccontextmanager
+async def write_scope(session: AsyncSession | None = None):
+    if session is not None:
+        try:
+            async with session.begin_nested():
+                yield session
+        finally:
+            await session.commit()
+    else:
+        async with async_session_maker() as session:
+            async with session.begin():
+                yield session
+
+
 class Base(AsyncAttrs, DeclarativeBase):
     created_at: Mapped[datetime] = mapped_column(server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(server_default=func.now(), onupdate=func.now())
 
+# Unique indexes added to tables of running bots, rows made before the index existed can break them
+# (double bookings of a slot), the first of such rows (lowest id) is kept
+DEDUPLICATED_INDEXES = {"ux_records_slot"}
+
+
+# Remove rows that duplicate an earlier row by index columns, every removed row is logged
+def remove_duplicates(connection, index) -> int:
+    table = index.table
+    columns = list(index.columns)
+    # rows with NULL in index columns do not violate unique index
+    complete = and_(*(column.is_not(None) for column in columns))
+    first_rows = select(func.min(table.c.id)).where(complete).group_by(*columns)
+    duplicates = connection.execute(
+        select(table).where(complete, table.c.id.not_in(first_rows)).order_by(table.c.id)
+    ).mappings().all()
+
+    for row in duplicates:
+        logging.warning(f"Row duplicating {index.name} is removed from {table.name}: {dict(row)}")
+    if duplicates:
+        connection.execute(delete(table).where(table.c.id.in_([row["id"] for row in duplicates])))
+    return len(duplicates)
+
+
+# Create index if table does not have it yet, duplicates are removed first (in the same transaction)
+def create_index(connection, index):
+    if index.name in {item["name"] for item in inspect(connection).get_indexes(index.table.name)}:
+        return
+    if index.name in DEDUPLICATED_INDEXES:
+        removed = remove_duplicates(connection, index)
+        if removed:
+            logging.warning(f"{removed} duplicate rows removed from {index.table.name} before creating {index.name}")
+    index.create(connection)
+
+
 # create database
 async def init_models() -> None:
+    # all models have to be registered in Base.metadata
+    import database.models
+
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+
+    # tables created before an index was added to the models do not get it from create_all
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            try:
+                async with engine.begin() as conn:
+                    await conn.run_sync(create_index, index)
+            except SQLAlchemyError as e:
+                # unique indexes guard data (one booking per slot), bot must not run without them
+                if index.unique:
+                    raise RuntimeError(
+                        f"Unique index {index.name} was not created (duplicate rows in {table.name}?): {e}"
+                    ) from e
+                logging.warning(f"Index {index.name} was not created: {e}")
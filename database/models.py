@@ -1,6 +1,6 @@
 from database.database import Base
 from sqlalchemy.orm import mapped_column, Mapped, relationship
-from sqlalchemy import BigInteger, ForeignKey, Integer, String, Date, Time, Boolean
+from sqlalchemy import BigInteger, ForeignKey, Integer, String, Date, Time, Boolean, Index, JSON
 from datetime import date, time
 
 class User(Base):
@@ -16,6 +16,10 @@ class User(Base):
     # relationships
     records: Mapped[list["Record"]] = relationship("Record", back_populates="user")
 
+    # server generated columns come back with INSERT / UPDATE (RETURNING, or SELECT if not supported),
+    # so new and updated users need no extra query to be read
+    __mapper_args__ = {"eager_defaults": True}
+
     def to_dict(self):
         return {
             "telegram_id": self.telegram_id,
@@ -31,6 +35,16 @@ class User(Base):
 
 class Record(Base):
     __tablename__ = "records"
+    __table_args__ = (
+        # one booking per room time slot, also serves lookups by building, room and date
+        Index("ux_records_slot", "building", "room", "date", "time_slot_start", unique=True),
+        # bookings of a user
+        Index("ix_records_user_id_date", "user_id", "date"),
+        # bookings of a period ordered by date and time (schedule import, export, cleanup)
+        Index("ix_records_date_time_slot_start", "date", "time_slot_start"),
+        # upcoming bookings of a building
+        Index("ix_records_building_date", "building", "date"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.telegram_id"))
@@ -55,3 +69,12 @@ class Record(Base):
             "user": self.user.to_dict(),
             "created_at": self.created_at
         }
+
+
+# FSM state and data of a chat (persistent aiogram storage)
+class FSMRecord(Base):
+    __tablename__ = "fsm_states"
+
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    state: Mapped[str] = mapped_column(String, nullable=True)
+    data: Mapped[dict] = mapped_column(JSON, default=dict)
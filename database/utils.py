@@ -1,89 +1,215 @@
+import logging
+from dataclasses import dataclass
 from typing import List
 
-from sqlalchemy import select, update, delete
+from cachetools import TTLCache
+from sqlalchemy import String, cast, event, func, select, update, delete
 from sqlalchemy.orm import selectinload, joinedload
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
 from config import config
-from database.database import async_session_maker
+from database.database import async_session_maker, session_scope, write_scope
 from database.models import User, Record
 
+logger = logging.getLogger(__name__)
+
 from datetime import datetime, UTC, timedelta
 
+
+# Read-only copy of user row kept in cache (safe to share between sessions and updates)
+@dataclass(frozen=True, slots=True)
+class CachedUser:
+    telegram_id: int
+    username: str | None
+    full_name: str | None
+    email: str | None
+    email_verified: bool
+    user_type: str | None
+    created_at: datetime | None
+    updated_at: datetime | None
+
+    @classmethod
+    def from_user(cls, user: User) -> "CachedUser":
+        return cls(user.telegram_id, user.username, user.full_name, user.email, user.email_verified,
+                   user.user_type, user.created_at, user.updated_at)
+
+    def to_dict(self) -> dict:
+        return {
+            "telegram_id": self.telegram_id,
+            "username": self.username,
+            "full_name": self.full_name,
+            "email": self.email,
+            "email_verified": self.email_verified,
+            "user_type": self.user_type,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+
+class UserCache:
+    """
+    LRU cache of users by telegram id, entries expire after "ttl" seconds.
+    Users that are not registered are cached too (as "None").
+
+    Attributes:
+        hits (int): reads served from cache.
+        misses (int): reads that went to database.
+    """
+    def __init__(self, maxsize: int = config.USER_CACHE_SIZE, ttl: float = config.USER_CACHE_TTL):
+        self.users = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0 # changed on every invalidation
+
+    def get(self, telegram_id: int) -> tuple[bool, CachedUser | None]:
+        """
+        Returns:
+            tuple[bool, CachedUser | None]: "True" and user if telegram id is in cache
+        """
+        if telegram_id in self.users:
+            self.hits += 1
+            return True, self.users[telegram_id]
+        self.misses += 1
+        return False, None
+
+    def put(self, telegram_id: int, user: CachedUser | None, generation: int):
+        # user read before an invalidation may be outdated already
+        if generation == self.generation:
+            self.users[telegram_id] = user
+
+    def invalidate(self, telegram_id: int):
+        self.generation += 1
+        self.users.pop(telegram_id, None)
+
+    def stats(self) -> dict:
+        reads = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / reads if reads else 0.0,
+            "size": len(self.users)
+        }
+
+
+# global cache of users
+USER_CACHE = UserCache()
+
+
+# Changed user is removed from cache now and once more after commit,
+# so a read made before commit can not leave old data in cache
+def invalidate_user(session: AsyncSession, telegram_id: int):
+    USER_CACHE.invalidate(telegram_id)
+    session.info.setdefault("changed_users", set()).add(telegram_id)
+
+
+@event.listens_for(Session, "after_commit")
+def invalidate_committed_users(session: Session):
+    for telegram_id in session.info.pop("changed_users", ()):
+        USER_CACHE.invalidate(telegram_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def forget_changed_users(session: Session):
+    session.info.pop("changed_users", None)
+
+
 async def create_user(
     telegram_id: int,
     full_name: str,
     username: str | None = None,
     email: str | None = None,
-    user_type: str | None = None
+    user_type: str | None = None,
+    session: AsyncSession | None = None
 ) -> User:
-    async with async_session_maker() as session:
-        try:
-            new_user = User(
-                telegram_id=telegram_id,
-                full_name=full_name,
-                username=username,
-                email=email,
-                user_type=user_type,
-                email_verified=True  # Set to True since we verified it
-            )
-
-            session.add(new_user)
-            await session.commit()
-
-        except SQLAlchemyError as e:
-            print(e)
-            await session.rollback()
+    new_user = User(
+        telegram_id=telegram_id,
+        full_name=full_name,
+        username=username,
+        email=email,
+        user_type=user_type,
+        email_verified=True  # Set to True since we verified it
+    )
+
+    try:
+        async with write_scope(session) as s:
+            s.add(new_user)
+            invalidate_user(s, telegram_id)
+
+    except SQLAlchemyError as e:
+        print(e)
     return new_user
 
 
-# get user by telegram id
-async def get_user(telegram_id: int) -> User | None:
-    async with async_session_maker() as session:
+# get user by telegram id (from cache if it was read recently)
+async def get_user(telegram_id: int, session: AsyncSession | None = None) -> CachedUser | None:
+    found, user = USER_CACHE.get(telegram_id)
+    if found:
+        return user
+    generation = USER_CACHE.generation
+
+    async with session_scope(session) as s:
         try:
             query = select(User).where(User.telegram_id == telegram_id)
-            user = await session.execute(query)
+            user = await s.execute(query)
             user = user.scalar_one_or_none()
-            return user
         except SQLAlchemyError as e:
             print(e)
+            return None
+
+        # user changed in this session but not committed yet is not cached
+        if telegram_id in s.info.get("changed_users", ()):
+            return CachedUser.from_user(user) if user else None
+
+    user = CachedUser.from_user(user) if user else None
+    USER_CACHE.put(telegram_id, user, generation)
+    return user
 
 
 
 # check if user is in database
-async def user_exist(telegram_id: int) -> bool:
-    async with async_session_maker() as session:
+async def user_exist(telegram_id: int, session: AsyncSession | None = None) -> bool:
+    async with session_scope(session) as s:
         query = select(User).where(User.telegram_id == telegram_id)
-        user_data = await session.execute(query)
+        user_data = await s.execute(query)
         user = user_data.scalar_one_or_none()
 
     return user is not None
 
 
-# update user data
-async def update_user(telegram_id:int, **kwargs) -> User:
-    async with async_session_maker() as session:
-        try:
-            statement = update(User).where(User.telegram_id == telegram_id).values(**kwargs)
-            await session.execute(statement)
-
-            await session.commit()
-        except SQLAlchemyError as e:
-            print(e)
-            await session.rollback()
-
-    return await get_user(telegram_id)
+# update user data, updated row is returned by the same statement (UPDATE ... RETURNING)
+# or read in the same session if database does not support it (SQLite before 3.35)
+async def update_user(telegram_id:int, session: AsyncSession | None = None, **kwargs) -> CachedUser | None:
+    statement = update(User).where(User.telegram_id == telegram_id).values(**kwargs)
+    try:
+        async with write_scope(session) as s:
+            invalidate_user(s, telegram_id)
+            if s.get_bind().dialect.update_returning:
+                result = await s.execute(
+                    statement.returning(User).execution_options(populate_existing=True)
+                )
+            else:
+                await s.execute(statement)
+                result = await s.execute(select(User).where(User.telegram_id == telegram_id))
+            user = result.scalar_one_or_none()
+
+    except SQLAlchemyError as e:
+        print(e)
+        # user was not changed
+        return await get_user(telegram_id, session=session)
+    return CachedUser.from_user(user) if user else None
 
 
 # delete user
-async def delete_user(telegram_id: int):
-    async with async_session_maker() as session:
-        try:
+async def delete_user(telegram_id: int, session: AsyncSession | None = None):
+    try:
+        async with write_scope(session) as s:
             statement = delete(User).where(User.telegram_id == telegram_id)
-            await session.execute(statement)
-            await session.commit()
-        except SQLAlchemyError as e:
-            print(e)
+            invalidate_user(s, telegram_id)
+            await s.execute(statement)
+    except SQLAlchemyError as e:
+        print(e)
 
 
 # create new record of booking a room
@@ -93,33 +219,86 @@ async def create_record(
     room: str,
     date: datetime.date,
     time_slot_start: datetime.time,
-    time_slot_end: datetime.time
+    time_slot_end: datetime.time,
+    session: AsyncSession | None = None
 ):
-    async with async_session_maker() as session:
-        try:
-            record = Record(
-                user_id=telegram_id,
-                building=building,
-                room=room,
-                date=date,
-                time_slot_start=time_slot_start,
-                time_slot_end=time_slot_end
-            )
-
-            session.add(record)
-            await session.commit()
+    record = Record(
+        user_id=telegram_id,
+        building=building,
+        room=room,
+        date=date,
+        time_slot_start=time_slot_start,
+        time_slot_end=time_slot_end
+    )
 
-        except SQLAlchemyError as e:
-            print(e)
-            await session.rollback()
+    try:
+        async with write_scope(session) as s:
+            s.add(record)
+
+    except SQLAlchemyError as e:
+        print(e)
+
+
+# book time slot of a room in one insert, unique index on the slot rejects the second booking
+async def book_slot(
+    telegram_id: int,
+    building: str,
+    room: str,
+    date: datetime.date,
+    time_slot_start: datetime.time,
+    time_slot_end: datetime.time,
+    session: AsyncSession | None = None
+) -> Record | None:
+    """
+    In the session of the update the insert is made in a savepoint,
+    so a taken slot does not break the session for the rest of the update.
+
+    Returns:
+        Record | None: created record, "None" if the slot is already booked
+
+    Raises:
+        SQLAlchemyError: booking failed for another reason (database locked, connection lost, ...)
+    """
+    record = Record(
+        user_id=telegram_id,
+        building=building,
+        room=room,
+        date=date,
+        time_slot_start=time_slot_start,
+        time_slot_end=time_slot_end
+    )
+
+    try:
+        async with write_scope(session) as s:
+            s.add(record)
+        return record
+
+    except IntegrityError as e:
+        if is_slot_taken(e):
+            return None
+        logger.error(f"Booking of {building} {room} {date} {time_slot_start} failed: {e}")
+        raise
+
+    except SQLAlchemyError as e:
+        logger.error(f"Booking of {building} {room} {date} {time_slot_start} failed: {e}")
+        raise
+
+
+# Unique violation of the slot index (the slot is booked by someone else), not of any other constraint
+def is_slot_taken(error: IntegrityError) -> bool:
+    message = str(error.orig)
+    slot_index = next(index for index in Record.__table__.indexes if index.name == "ux_records_slot")
+    # PostgreSQL names the constraint, SQLite lists its columns
+    slot_columns = ", ".join(f"{Record.__tablename__}.{column.name}" for column in slot_index.columns)
+    return slot_index.name in message or slot_columns in message
 
 
 # get list of all records for a specific user
-async def get_user_records(telegram_id: int) -> List[Record]:
-    async with async_session_maker() as session:
+async def get_user_records(telegram_id: int, session: AsyncSession | None = None) -> List[Record]:
+    async with session_scope(session) as s:
         try:
             query = select(Record).where(Record.user_id == telegram_id)
-            users_data = await session.execute(query)
+            users_data = await s.execute(query)
             users = users_data.scalars().all()
 
         except SQLAlchemyError as e:
@@ -129,12 +308,13 @@ async def get_user_records(telegram_id: int) -> List[Record]:
 
 
 # get list of records for specific building, room, date
-async def get_records_by_building_room_date(building: str, room:str, date:datetime.date) -> List[Record]:
+async def get_records_by_building_room_date(building: str, room:str, date:datetime.date,
+                                            session: AsyncSession | None = None) -> List[Record]:
     records: List[Record] = []
-    async with async_session_maker() as session:
+    async with session_scope(session) as s:
         try:
             query = select(Record).where(Record.building == building, Record.room == room, Record.date == date)
-            records_data = await session.execute(query)
+            records_data = await s.execute(query)
             records = records_data.scalars().all()
         except SQLAlchemyError as e:
             print(e)
@@ -177,6 +357,22 @@ async def check_if_booked(building: str, room: str, date: datetime.date, start:d
         except SQLAlchemyError as e:
             print(e)
 
+# get all records for the date period with users loaded (bulk lookup for schedule import)
+async def get_records_by_period(start_date: datetime.date, end_date: datetime.date) -> List[Record]:
+    records: List[Record] = []
+    async with async_session_maker() as session:
+        try:
+            query = select(Record).where(
+                Record.date >= start_date,
+                Record.date <= end_date
+            ).options(selectinload(Record.user))
+            records_data = await session.execute(query)
+            records = records_data.scalars().all()
+        except SQLAlchemyError as e:
+            print(e)
+
+    return records
+
 # # get records by date and room number
 # async def get_records_by_date_room(date: datetime.date, room: str) -> List[Record]:
 #     async with async_session_maker() as session:
@@ -236,6 +432,54 @@ async def get_all_records_n_days() -> List[Record] | None:
             print(e)
 
 
+# Columns of records export: record with user data, without ORM objects
+def records_export_query(start_date: datetime.date):
+    return select(
+        Record.id,
+        User.full_name,
+        User.user_type,
+        User.username,
+        User.telegram_id,
+        User.email,
+        Record.building,
+        Record.room,
+        Record.date,
+        Record.time_slot_start,
+        Record.time_slot_end
+    ).outerjoin(User, Record.user).where(Record.date >= start_date)
+
+
+# Number of records for export and the longest values of text columns (for column widths)
+async def get_records_export_summary(start_date: datetime.date):
+    query = records_export_query(start_date).subquery()
+    async with async_session_maker() as session:
+        try:
+            summary = await session.execute(select(
+                func.count().label("records"),
+                func.max(query.c.id).label("id"),
+                func.max(func.length(query.c.full_name)).label("full_name"),
+                func.max(func.length(query.c.user_type)).label("user_type"),
+                func.max(func.length(
+                    func.coalesce(query.c.username, cast(query.c.telegram_id, String))
+                )).label("telegram"),
+                func.max(func.length(query.c.email)).label("email"),
+                func.max(func.length(query.c.building)).label("building"),
+                func.max(func.length(query.c.room)).label("room")
+            ))
+            return summary.one()
+        except SQLAlchemyError as e:
+            print(e)
+
+
+# Stream records for export ordered by date and time, "batch_size" rows are held in memory at a time
+async def stream_records_export(start_date: datetime.date, batch_size: int = 1000):
+    query = records_export_query(start_date).order_by(Record.date, Record.time_slot_start)
+    async with async_session_maker() as session:
+        result = await session.stream(query.execution_options(yield_per=batch_size))
+        async for row in result:
+            yield row
+
+
 # Deleting records that are config.DAYS_TO_LOAD_FROM_DB days old
 async def delete_old_records() -> bool:
     end_date = datetime.now(UTC) + timedelta(hours=config.TIMEZONE, days=-1 * config.DAYS_TO_LOAD_FROM_DB)
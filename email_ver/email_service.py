@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import smtplib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from config import config
+
+
+# SMTP errors that will not go away on retry (bad recipient, rejected credentials, permanent 5xx replies)
+def is_permanent_error(error: Exception) -> bool:
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return True
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600
+    return False
+
+
+class EmailService:
+    """
+    Background email delivery.
+
+    Messages are put to an asyncio queue and sent by worker tasks, every worker uses its own thread
+    with a persistent authenticated SMTP connection (reopened when the server drops it).
+    Failed deliveries are retried with exponential backoff.
+
+    Attributes:
+        workers (int): number of worker tasks (and SMTP connections).
+        retries (int): number of attempts to deliver a message.
+        backoff (float): seconds to wait before the second attempt, doubled for every next one.
+    """
+    def __init__(self, host: str = config.SMTP_SERVER, port: int = config.SMTP_PORT,
+                 username: str = config.EMAIL, password: str = config.EMAIL_PASSWORD,
+                 sender: str = config.EMAIL, starttls: bool = True,
+                 workers: int = config.SMTP_POOL_SIZE, retries: int = 3, backoff: float = 1.0, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender
+        self.starttls = starttls
+        self.workers = workers
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self.queue = None
+        self.worker_tasks = []
+        self.executor = None
+        self.connections = threading.local() # SMTP connection of the worker thread
+        self.opened_connections = []
+        self.connections_lock = threading.Lock()
+
+    def start(self):
+        if self.worker_tasks:
+            return
+
+        self.queue = asyncio.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="smtp")
+        self.worker_tasks = [asyncio.create_task(self.__worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Deliver queued messages, then stop workers and close SMTP connections"""
+        if not self.worker_tasks:
+            return
+
+        await self.queue.join()
+        for task in self.worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self.worker_tasks, return_exceptions=True)
+        self.worker_tasks = []
+
+        await asyncio.get_running_loop().run_in_executor(self.executor, self.__close_all)
+        self.executor.shutdown(wait=True)
+
+    def send(self, recipient: str, subject: str, body: str, subtype: str = "html") -> asyncio.Future:
+        """
+        Put message to delivery queue.
+
+        Returns:
+            asyncio.Future: resolves to "True" when message is delivered, "False" if delivery failed
+        """
+        self.start()
+        status = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((recipient, subject, body, subtype, status))
+        return status
+
+    async def __worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            recipient, subject, body, subtype, status = await self.queue.get()
+            try:
+                delivered = False
+                for attempt in range(self.retries):
+                    try:
+                        await loop.run_in_executor(self.executor, self.__deliver, recipient, subject, body, subtype)
+                        delivered = True
+                        break
+                    except (smtplib.SMTPException, OSError) as e:
+                        if is_permanent_error(e) or attempt == self.retries - 1:
+                            logging.error(f"Email to {recipient} was not sent: {e!r}")
+                            break
+                        logging.warning(f"Email to {recipient} failed (attempt {attempt + 1}): {e!r}, retrying")
+                        await asyncio.sleep(self.backoff * 2 ** attempt)
+
+                if delivered:
+                    logging.info(f"Email was sent successfully - details: {recipient} - {subject}")
+                if not status.done():
+                    status.set_result(delivered)
+            finally:
+                self.queue.task_done()
+
+    # Runs in worker thread
+    def __deliver(self, recipient: str, subject: str, body: str, subtype: str):
+        msg = MIMEMultipart()
+        msg['From'] = self.sender
+        msg['To'] = recipient
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, subtype))
+
+        message = msg.as_string()
+        try:
+            try:
+                self.__connection().sendmail(self.sender, recipient, message)
+            except smtplib.SMTPServerDisconnected:
+                # persistent connection was closed by server (idle timeout), send once more over a new one
+                self.__drop_connection()
+                self.__connection().sendmail(self.sender, recipient, message)
+        except (smtplib.SMTPServerDisconnected, OSError):
+            self.__drop_connection()
+            raise
+
+    def __connection(self) -> smtplib.SMTP:
+        server = getattr(self.connections, "server", None)
+        if server is None:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            try:
+                if self.starttls:
+                    server.starttls()  # Secure connection
+                if self.password:
+                    server.login(self.username, self.password)
+            except (smtplib.SMTPException, OSError):
+                server.close()
+                raise
+
+            self.connections.server = server
+            with self.connections_lock:
+                self.opened_connections.append(server)
+        return server
+
+    def __drop_connection(self):
+        server = getattr(self.connections, "server", None)
+        self.connections.server = None
+        if server is not None:
+            with self.connections_lock:
+                if server in self.opened_connections:
+                    self.opened_connections.remove(server)
+            server.close()
+
+    def __close_all(self):
+        with self.connections_lock:
+            servers, self.opened_connections = self.opened_connections, []
+        for server in servers:
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                server.close()
+
+
+# global email service used by handlers
+EMAIL_SERVICE = EmailService()
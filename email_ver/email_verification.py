@@ -1,7 +1,5 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from config import config
+from email_ver.email_service import EMAIL_SERVICE
+from email_ver.templates import TEMPLATES
 import logging
 import random
 
@@ -12,14 +10,14 @@ class Email:
     def __init__(self, recipient_email: str, recipient_name: str = "Пользователь"):
         self.recipient_email = recipient_email
         self.recipient_name = recipient_name
-        self.subject = "Бронирование Аудиторий - подтверждение адреса электронной почты"
 
         self.__generate_code()
         self.__construct_body()
 
     def __construct_body(self):
-        with open("email_ver/email_template.html") as f:
-            self.body = f.read().replace("{code}", self.code).replace("{User's Name}", self.recipient_name)
+        self.subject, self.body = TEMPLATES.render(
+            "verification", {"code": self.code, "User's Name": self.recipient_name or "Пользователь"}
+        )
 
     def __generate_code(self):
         """
@@ -27,25 +25,13 @@ class Email:
         """
         self.code = f"{random.randint(0, 999999):06d}"
 
-    async def send_email(self):
-        try:
-            # Create MIME message
-            logging.info(f"Preparing email to be sent - details: {self.recipient_email} - {self.subject}")
-            msg = MIMEMultipart()
-            msg['From'] = config.EMAIL
-            msg['To'] = self.recipient_email
-            msg['Subject'] = self.subject
-            msg.attach(MIMEText(self.body, 'html'))
-
-            # Connect to SMTP server
-            with smtplib.SMTP(config.SMTP_SERVER, config.SMTP_PORT) as server:
-                server.starttls()  # Secure connection
-                server.login(config.EMAIL, config.EMAIL_PASSWORD)
-                server.sendmail(config.EMAIL, self.recipient_email, msg.as_string())
-                logging.info("Email was sent successfully!")
-        except Exception as e:
-            logging.error(f"An error occurred in email sending: {e}")
-
+    async def send_email(self) -> bool:
+        """
+        Returns:
+            bool: "True" if email was delivered (sent by background email service)
+        """
+        logging.info(f"Preparing email to be sent - details: {self.recipient_email} - {self.subject}")
+        return await EMAIL_SERVICE.send(self.recipient_email, self.subject, self.body)
 
 
 if __name__ == "__main__":
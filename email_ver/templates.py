@@ -0,0 +1,63 @@
+import html
+import re
+from pathlib import Path
+
+
+# Templates are looked up next to this module, not in the current working directory
+TEMPLATES_DIR = Path(__file__).resolve().parent
+
+# "{code}", "{User's Name}": no braces or line breaks inside and no leading space (CSS blocks are not placeholders)
+PLACEHOLDER_PATTERN = re.compile(r"\{([^{}\s][^{}\n]*)\}")
+
+
+class EmailTemplate:
+    """
+    Email template compiled once: text is split into literal parts and placeholder names.
+
+    Attributes:
+        subject (str): email subject.
+        parts (list[str]): literal text at even positions, placeholder names at odd positions.
+        placeholders (set[str]): names of placeholders in the template.
+    """
+    def __init__(self, subject: str, source: str, escape: bool = True):
+        self.subject = subject
+        self.parts = PLACEHOLDER_PATTERN.split(source)
+        self.placeholders = set(self.parts[1::2])
+        self.escape = escape
+
+    def render(self, values: dict) -> str:
+        """
+        Substitutes all placeholders in a single pass, missing values are rendered empty.
+        """
+        parts = self.parts.copy()
+        for i in range(1, len(parts), 2):
+            value = str(values.get(parts[i], ""))
+            parts[i] = html.escape(value) if self.escape else value
+        return "".join(parts)
+
+
+class TemplateRegistry:
+    def __init__(self, directory: Path = TEMPLATES_DIR):
+        self.directory = directory
+        self.templates = {}
+
+    def register(self, name: str, file_name: str, subject: str):
+        source = (self.directory / file_name).read_text(encoding="utf-8")
+        self.templates[name] = EmailTemplate(subject, source, escape=file_name.endswith(".html"))
+
+    def get(self, name: str) -> EmailTemplate:
+        return self.templates[name]
+
+    def render(self, name: str, values: dict) -> tuple[str, str]:
+        """
+        Returns:
+            tuple[str, str]: subject and body of the email
+        """
+        template = self.templates[name]
+        return template.subject, template.render(values)
+
+
+# all email templates, loaded at startup
+TEMPLATES = TemplateRegistry()
+TEMPLATES.register("verification", "email_template.html",
+                   "Бронирование Аудиторий - подтверждение адреса электронной почты")
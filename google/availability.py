@@ -0,0 +1,178 @@
+from array import array
+from datetime import date
+
+
+class AvailabilityStore:
+    """
+    Compact availability of rooms by dates and time slots.
+
+    One byte per room and date, bit "i" is set if time slot "i" (position in TIME_SLOTS) is free.
+    Slots that are not bookable (already passed today) are stored as busy.
+    Slot data is kept in segments per room, so a copy with one changed room (copy_room)
+    shares segments of all other rooms.
+
+    Attributes:
+        dates (tuple[date]): loaded dates, position of date is its day index.
+        rooms (list[tuple[str, str]]): (building name, room number), position of room is its room index.
+        bits (list[bytearray]): free slots bitmask of every day (by day index) by room index.
+        occupants (list[dict]): (day index, slot index) -> (name, comment) of busy slots by room index.
+        free_counts (array): number of free slots over all dates by room index (availability summary).
+    """
+    def __init__(self, dates: tuple[date, ...] = ()):
+        self.dates = tuple(dates)
+        self.day_indexes = {target_date.isoformat(): i for i, target_date in enumerate(self.dates)}
+        self.rooms = []
+        self.room_indexes = {}
+        self.building_rooms = {} # building name -> list of room indexes
+        self.bits = []
+        self.occupants = []
+        self.free_counts = array("H")
+
+    @classmethod
+    def from_buildings(cls, buildings: list, dates: tuple[date, ...]) -> "AvailabilityStore":
+        store = cls(dates)
+        for building in buildings:
+            for room in building.rooms:
+                store.add_room(building.building_name, room.room_number)
+                for date_cell in room.dates:
+                    for slot in date_cell.time_slots:
+                        store.set_slot(
+                            building.building_name, room.room_number, date_cell.date.isoformat(), slot.index,
+                            slot.status.is_free, slot.status.name, slot.status.comment
+                        )
+        return store
+
+    def add_room(self, building_name: str, room_number: str) -> int:
+        room_index = len(self.rooms)
+        self.rooms.append((building_name, room_number))
+        self.room_indexes[(building_name, room_number)] = room_index
+        self.building_rooms.setdefault(building_name, []).append(room_index)
+        self.bits.append(bytearray(len(self.dates)))
+        self.occupants.append({})
+        self.free_counts.append(0)
+        return room_index
+
+    def __shallow_copy(self) -> "AvailabilityStore":
+        # Rooms and dates are fixed once the store is built, segments of rooms are shared
+        new_store = AvailabilityStore.__new__(AvailabilityStore)
+        new_store.dates = self.dates
+        new_store.day_indexes = self.day_indexes
+        new_store.rooms = self.rooms
+        new_store.room_indexes = self.room_indexes
+        new_store.building_rooms = self.building_rooms
+        new_store.bits = list(self.bits)
+        new_store.occupants = list(self.occupants)
+        new_store.free_counts = array("H", self.free_counts)
+        return new_store
+
+    def copy(self) -> "AvailabilityStore":
+        new_store = self.__shallow_copy()
+        new_store.bits = [bytearray(room_bits) for room_bits in self.bits]
+        new_store.occupants = [dict(room_occupants) for room_occupants in self.occupants]
+        return new_store
+
+    def copy_room(self, building_name: str, room_number: str) -> "AvailabilityStore":
+        """
+        Returns:
+            AvailabilityStore: copy where only slots of the room can be changed
+            (other rooms are shared with this store and must not be changed in either of them)
+        """
+        new_store = self.__shallow_copy()
+        room_index = self.room_indexes.get((building_name, room_number))
+        if room_index is not None:
+            new_store.bits[room_index] = bytearray(self.bits[room_index])
+            new_store.occupants[room_index] = dict(self.occupants[room_index])
+        return new_store
+
+    def __position(self, building_name: str, room_number: str, iso_date: str) -> tuple[int, int] | None:
+        room_index = self.room_indexes.get((building_name, room_number))
+        day_index = self.day_indexes.get(iso_date)
+        if room_index is None or day_index is None:
+            return None
+        return room_index, day_index
+
+    def set_slot(self, building_name: str, room_number: str, iso_date: str, slot_index: int,
+                 is_free: bool, name: str = None, comment: str = None) -> bool:
+        position = self.__position(building_name, room_number, iso_date)
+        if position is None or slot_index is None:
+            return False
+
+        room_index, day_index = position
+        room_bits = self.bits[room_index]
+        old_bits = room_bits[day_index]
+        if is_free:
+            room_bits[day_index] |= 1 << slot_index
+            self.occupants[room_index].pop((day_index, slot_index), None)
+        else:
+            room_bits[day_index] &= ~(1 << slot_index) & 0xFF
+            if name or comment:
+                self.occupants[room_index][(day_index, slot_index)] = (name, comment)
+
+        # keep availability summary in sync
+        self.free_counts[room_index] += room_bits[day_index].bit_count() - old_bits.bit_count()
+        return True
+
+    def free_slots_count(self, building_name: str, room_number: str) -> int:
+        """
+        Returns:
+            int: number of free slots of the room over all loaded dates
+        """
+        room_index = self.room_indexes.get((building_name, room_number))
+        return self.free_counts[room_index] if room_index is not None else 0
+
+    def free_mask(self, building_name: str, room_number: str, iso_date: str) -> int:
+        position = self.__position(building_name, room_number, iso_date)
+        if position is None:
+            return 0
+
+        room_index, day_index = position
+        return self.bits[room_index][day_index]
+
+    def free_slots(self, building_name: str, room_number: str, iso_date: str) -> list[int]:
+        """
+        Returns:
+            list[int]: indexes of free time slots of the room on the date
+        """
+        mask = self.free_mask(building_name, room_number, iso_date)
+        return [slot_index for slot_index in range(8) if mask >> slot_index & 1]
+
+    def room_free_mask(self, building_name: str, room_number: str) -> int:
+        """
+        Returns:
+            int: bitmask of days (by day index) when the room has at least one free slot
+        """
+        room_index = self.room_indexes.get((building_name, room_number))
+        if room_index is None:
+            return 0
+
+        mask = 0
+        for day_index, day_bits in enumerate(self.bits[room_index]):
+            if day_bits:
+                mask |= 1 << day_index
+        return mask
+
+    def rooms_free_at(self, building_name: str, iso_date: str, slot_index: int) -> list[str]:
+        """
+        Returns:
+            list[str]: numbers of building rooms that are free on the date at the time slot
+        """
+        day_index = self.day_indexes.get(iso_date)
+        if day_index is None:
+            return []
+
+        slot_bit = 1 << slot_index
+        return [
+            self.rooms[room_index][1]
+            for room_index in self.building_rooms.get(building_name, [])
+            if self.bits[room_index][day_index] & slot_bit
+        ]
+
+    def occupant(self, building_name: str, room_number: str, iso_date: str, slot_index: int) -> tuple[str, str] | None:
+        position = self.__position(building_name, room_number, iso_date)
+        if position is None:
+            return None
+        room_index, day_index = position
+        return self.occupants[room_index].get((day_index, slot_index))
+
+    def __repr__(self):
+        return f"AvailabilityStore: {len(self.rooms)} rooms | {len(self.dates)} dates | {len(self.rooms) * len(self.dates)} bytes"
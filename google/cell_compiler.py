@@ -0,0 +1,198 @@
+from datetime import datetime, timedelta, date
+from functools import lru_cache
+import re
+
+from config import config
+
+
+# Maximum number of distinct cell contents kept compiled
+CELL_RULES_CACHE_SIZE = 4096
+
+UPPER_LOWER_PATTERN = re.compile(r'(?s)\A(.*?)\r?\n?[ \t]*-+[ \t]*\r?\n?(.*)\Z')
+EXACT_DATES_PATTERN = re.compile(r"^(?:\d{1,2}\.\d{1,2}\.\d{4})(?:,\s*\d{1,2}\.\d{1,2}\.\d{4})*$")
+PATTERN_FROM = re.compile(r"с\s+(\d{2}\.\d{2}\.\d{4})")
+PATTERN_TO = re.compile(r"по\s+(\d{2}\.\d{2}\.\d{4})")
+PATTERN_OUT = re.compile(r'(?P<date>\d{1,2}\.\d{1,2}\.\d{4})\s+[вВ]\s+(?P<room>\d{3})\*{3}')
+PATTERN_IN = re.compile(r'(?P<date>\d{1,2}\.\d{1,2}\.\d{4})\s+из\s+(?P<room>\d{3})\*{3}')
+
+
+# Verify if week is upper (else it is lower)
+def is_upper_week(
+        target_date: date,
+        upper_week_date: date = config.UPPER_WEEK_START_DATE
+) -> bool:
+    """
+    Parameters:
+        target_date (datetime.date): The date to be checked if it is in an upper week
+        upper_week_date (datetime.date): The date indicating start of upper week
+
+    Returns:
+        bool: 'True' if it is upper week, 'False' otherwise
+    """
+
+    # Weekday of upper week date
+    upper_week_weekday = upper_week_date.weekday()
+
+    # First day of the first upper week
+    upper_week_first_date = upper_week_date - timedelta(days=upper_week_weekday)
+
+    # calculate date difference between two dates + calculate weeks + identify if even or odd
+    time_diff = target_date - upper_week_first_date
+    return (time_diff.days // 7) % 2 == 0
+
+
+def _parse_date(date_str: str) -> date:
+    return datetime.strptime(date_str.strip(), "%d.%m.%Y").date()
+
+
+# "!" line: busy on exact dates
+class ExactDatesRule:
+    def __init__(self, dates: set, name: str, comment: str | None):
+        self.dates = dates
+        self.name = name
+        self.comment = comment
+
+    def apply(self, result: list, target_date: date) -> list:
+        if target_date in self.dates:
+            return result + [self.name, self.comment]
+        return result
+
+
+# "#" line: busy every week (or every other week) within period
+class PeriodRule:
+    def __init__(self, start_date: date | None, end_date: date | None, step: int, name: str, comment: str | None):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.step = step
+        self.name = name
+        self.comment = comment
+
+    def apply(self, result: list, target_date: date) -> list:
+        if self.start_date is not None:
+            if self.end_date is not None and target_date > self.end_date:
+                return result
+            if self.start_date <= target_date and (target_date - self.start_date).days % self.step == 0:
+                return [self.name, self.comment]
+        elif target_date <= self.end_date and (self.end_date - target_date).days % self.step == 0:
+            return [self.name, self.comment]
+        return result
+
+
+# "*... в ***" line: class moved out to another room on date
+class TransferOutRule:
+    def __init__(self, out_date: date):
+        self.out_date = out_date
+
+    def apply(self, result: list, target_date: date) -> list:
+        return [] if target_date == self.out_date else result
+
+
+# "*... из ***" line: class moved in from another room on date
+class TransferInRule:
+    def __init__(self, in_date: date, room: str):
+        self.in_date = in_date
+        self.name = f"Перенос с аудитории {room}"
+
+    def apply(self, result: list, target_date: date) -> list:
+        return [self.name, None] if target_date == self.in_date else result
+
+
+# "$" line: busy on every date
+class OverrideRule:
+    def __init__(self, name: str, comment: str | None):
+        self.name = name
+        self.comment = comment
+
+    def apply(self, result: list, target_date: date) -> list:
+        return [self.name, self.comment]
+
+
+class CellRule:
+    """
+    Compiled contents of a schedule cell.
+
+    Attributes:
+        upper_rules (tuple): line rules for upper week (or for every week if cell is not divided).
+        lower_rules (tuple | None): line rules for lower week, "None" if cell is not divided.
+    """
+    def __init__(self, upper_rules: tuple, lower_rules: tuple | None = None):
+        self.upper_rules = upper_rules
+        self.lower_rules = lower_rules
+
+    def busy_on(self, target_date: date) -> list:
+        """
+        Returns:
+            list: [name, comment] if cell is busy on target date, empty list otherwise
+        """
+        rules = self.upper_rules
+        if self.lower_rules is not None and not is_upper_week(target_date):
+            rules = self.lower_rules
+
+        result = []
+        for rule in rules:
+            result = rule.apply(result, target_date)
+        return result
+
+
+@lru_cache(maxsize=CELL_RULES_CACHE_SIZE)
+def compile_cell(cell_contents: str) -> CellRule:
+    # Divide cell contents by upper and lower weeks
+    if "---" in cell_contents:
+        m = UPPER_LOWER_PATTERN.match(cell_contents)
+        if m:
+            return CellRule(
+                _compile_lines(m.group(1).strip(), step=14),
+                _compile_lines(m.group(2).strip(), step=14)
+            )
+        return CellRule(_compile_lines(cell_contents, step=14))
+
+    return CellRule(_compile_lines(cell_contents, step=7))
+
+
+def _compile_lines(cell_contents: str, step: int) -> tuple:
+    rules = []
+    if cell_contents == "***":
+        return tuple(rules)
+
+    for line in cell_contents.split("\n"):
+        if line == "***" or line == "":
+            continue
+
+        line_data = [k.strip() for k in line[1:].split("-")]
+
+        if line[0] == "!":
+            if EXACT_DATES_PATTERN.match(line_data[0]):
+                exact_dates = {_parse_date(item) for item in line_data[0].split(",")}
+                rules.append(ExactDatesRule(exact_dates, *_name_comment(line_data[1:])))
+        elif line[0] == "#":
+            start_date_raw = PATTERN_FROM.findall(line[1:]) if "с " in line else []
+            end_date_raw = PATTERN_TO.findall(line[1:]) if "по " in line else []
+            if "с " in line and "по " in line and not (start_date_raw and end_date_raw):
+                continue
+            if start_date_raw or end_date_raw:
+                rules.append(PeriodRule(
+                    _parse_date(start_date_raw[0]) if start_date_raw else None,
+                    _parse_date(end_date_raw[0]) if end_date_raw else None,
+                    step,
+                    *_name_comment(line_data[1:])
+                ))
+        elif line[0] == "*":
+            if "в " in line:
+                out_date_raw = PATTERN_OUT.findall(line[1:])
+                if out_date_raw:
+                    rules.append(TransferOutRule(_parse_date(out_date_raw[0][0])))
+            elif "из " in line:
+                in_date_raw = PATTERN_IN.findall(line[1:])
+                if in_date_raw:
+                    rules.append(TransferInRule(_parse_date(in_date_raw[0][0]), in_date_raw[0][1]))
+        elif line[0] == "$":
+            rules.append(OverrideRule(*_name_comment(line_data)))
+
+    return tuple(rules)
+
+
+# Name and comment from "-" separated parts of the line
+def _name_comment(parts: list[str]) -> tuple[str | None, str | None]:
+    name = parts[0] if parts else None
+    comment = "-".join(parts[1:]) if len(parts) > 1 else None
+    return name, comment
@@ -1,16 +1,48 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import gspread
+import requests
+from oauth2client.client import Error as OAuth2ClientError
 from oauth2client.service_account import ServiceAccountCredentials
 from config import config
 
+# Dedicated executor for blocking gspread calls, keeps event loop free during schedule refresh
+GOOGLE_API_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="google-api")
+
+# HTTP timeout of one request is below the timeout of the whole call,
+# so a hanging request fails in its thread (and releases it) before the call is given up
+HTTP_TIMEOUT = config.GOOGLE_REQUEST_TIMEOUT * 0.8
+
+
+class GoogleAPIUnavailable(Exception):
+    """Google API call timed out or failed, data loaded before should be kept"""
+
+
 class GoogleAPIConnection:
+    """
+    Connection to the schedule spreadsheet.
+
+    It is established on first use instead of import, so the bot starts (and serves cached schedule)
+    while Google API is not available. Failed connection is made again by the next call.
+    """
     def __init__(self):
         self.__credentials = None
         self.__client = None
-        self.spreadsheet = None
+        self.__spreadsheet = None
+        self.__lock = threading.Lock()
 
-        self.__load_credentials()
-        self.__establish_connection()
-        self.__connect_to_spreadsheet()
+    # Spreadsheet, connects if needed (blocking, async code uses it inside run_blocking)
+    @property
+    def spreadsheet(self) -> gspread.Spreadsheet:
+        with self.__lock:
+            if self.__spreadsheet is None:
+                self.__load_credentials()
+                self.__establish_connection()
+                self.__connect_to_spreadsheet()
+            return self.__spreadsheet
 
     # Read credentials for Google API
     def __load_credentials(self):
@@ -22,18 +54,50 @@ class GoogleAPIConnection:
     # Authorize to Google API
     def __establish_connection(self):
         self.__client = gspread.authorize(self.__credentials)
+        # HTTP timeout, so that executor threads are released after cancelled calls
+        self.__client.set_timeout(HTTP_TIMEOUT)
 
     # Connect to spreadsheet
     def __connect_to_spreadsheet(self):
-        self.spreadsheet = self.__client.open_by_url(config.GOOGLE_TABLE_URL)
+        self.__spreadsheet = self.__client.open_by_url(config.GOOGLE_TABLE_URL)
 
     # Reinitialize connection
     def update_connection(self):
-        self.__init__()
+        with self.__lock:
+            self.__spreadsheet = None
+        return self.spreadsheet
+
+    # Run blocking gspread call in dedicated executor with timeout,
+    # timeout and request errors of the call raise GoogleAPIUnavailable
+    @staticmethod
+    async def run_blocking(func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(GOOGLE_API_EXECUTOR, functools.partial(func, *args, **kwargs))
+        try:
+            return await asyncio.wait_for(future, timeout=config.GOOGLE_REQUEST_TIMEOUT)
+        except asyncio.TimeoutError as e:
+            raise GoogleAPIUnavailable(f"no response in {config.GOOGLE_REQUEST_TIMEOUT}s") from e
+        except (gspread.exceptions.GSpreadException, requests.RequestException, OAuth2ClientError, OSError) as e:
+            raise GoogleAPIUnavailable(repr(e)) from e
+
+    # Async versions of gspread calls used by schedule import
+    async def fetch_sheet_metadata(self, params: dict = None) -> dict:
+        return await self.run_blocking(lambda: self.spreadsheet.fetch_sheet_metadata(params=params))
+
+    async def worksheets(self) -> list[gspread.Worksheet]:
+        return await self.run_blocking(lambda: self.spreadsheet.worksheets())
+
+    async def get_all_values(self, worksheet: gspread.Worksheet) -> list[list[str]]:
+        return await self.run_blocking(worksheet.get_all_values)
+
+    async def values_batch_get(self, ranges: list[str], params: dict = None) -> dict:
+        return await self.run_blocking(lambda: self.spreadsheet.values_batch_get(ranges, params=params))
 
     def __repr__(self):
-        return f"Spreadsheet name: \"{self.spreadsheet.title}\" | URL: \"{self.spreadsheet.url}\""
+        if self.__spreadsheet is None:
+            return "Spreadsheet is not connected"
+        return f"Spreadsheet name: \"{self.__spreadsheet.title}\" | URL: \"{self.__spreadsheet.url}\""
 
 
-# initiate connection sample
+# connection sample (connects on first use)
 conn = GoogleAPIConnection()
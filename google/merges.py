@@ -0,0 +1,27 @@
+from collections import defaultdict
+
+
+# Group merges of all worksheets in spreadsheet metadata by worksheet id
+def group_merges_by_sheet(metadata: dict) -> dict[int, list[dict]]:
+    merges_by_sheet = defaultdict(list)
+    for sheet in metadata["sheets"]:
+        for merge in sheet.get("merges", []):
+            # merges without "sheetId" belong to the first worksheet (id 0)
+            merges_by_sheet[merge.get("sheetId", 0)].append(merge)
+
+    return merges_by_sheet
+
+
+# Copy value of merged cell to all empty cells of the merge
+def expand_merges(worksheet_data: list[list[str]], merges: list[dict]):
+    for merge in merges:
+        start_row, end_row = merge["startRowIndex"], merge["endRowIndex"]
+        start_column, end_column = merge["startColumnIndex"], merge["endColumnIndex"]
+
+        # merge of empty cells outside loaded values, nothing to copy
+        if start_row >= len(worksheet_data) or start_column >= len(worksheet_data[start_row]):
+            continue
+
+        merged_values = [worksheet_data[start_row][start_column]] * (end_column - start_column)
+        for row in worksheet_data[start_row:end_row]:
+            row[start_column:end_column] = merged_values
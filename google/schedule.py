@@ -1,10 +1,16 @@
 from datetime import datetime, timedelta, time, UTC, date
 import asyncio
+import hashlib
+import logging
+from time import perf_counter as time_counter
 from config import config
 import copy
 from google.connection import conn
-import re
-from database.utils import check_if_booked
+from database.utils import get_records_by_period
+from gspread.utils import absolute_range_name, fill_gaps
+from google.cell_compiler import compile_cell, is_upper_week
+from google.merges import group_merges_by_sheet, expand_merges
+from google.availability import AvailabilityStore
 
 
 # GLOBAL VARIABLES
@@ -27,6 +33,9 @@ TIME_SLOTS = [
     {"start": time(hour=19, minute=40), "end": time(hour=21, minute=0)}
 ]
 
+# Position of time slot in TIME_SLOTS by its start time
+TIME_SLOT_INDEXES = {slot["start"]: i for i, slot in enumerate(TIME_SLOTS)}
+
 # Status of time slot if it is free or not
 class TimeSlotStatus:
     """
@@ -54,11 +63,13 @@ class TimeSlot:
     Attributes:
         start (datetime.time): start time of the time slot.
         end (datetime.time): end time of the time slot.
+        index (int): position of the time slot in TIME_SLOTS.
         status (TimeSlotStatus): status of the time slot.
     """
     def __init__(self, start: time, end: time):
         self.start = start
         self.end = end
+        self.index = TIME_SLOT_INDEXES.get(start)
         self.status = TimeSlotStatus()
 
 
@@ -72,10 +83,9 @@ class TimeSlot:
         return class_period, f"{self.start.strftime('%H:%M')}-{self.end.strftime('%H:%M')}"
 
     def __copy__(self):
-        new_item = TimeSlot(
-            time(hour=self.start.hour, minute=self.start.minute),
-            time(hour=self.end.hour, minute=self.end.minute)
-        )
+        # time objects are immutable and shared, only status is copied
+        new_item = TimeSlot(self.start, self.end)
+        new_item.status = TimeSlotStatus(self.status.is_free, self.status.name, self.status.comment)
         return new_item
 
     def __eq__(self, other):
@@ -99,6 +109,7 @@ class DateCell:
             date (datetime.date): date of the day when calendar date cell was created.
             weekday (str): weekday of the day when calendar date cell was created.
             time_slots (list[TimeSlot]): list of time slots within a calendar date and time.
+            slots_index (dict[int, TimeSlot]): time slots by their index in TIME_SLOTS.
         """
     time_slots_template = [
         TimeSlot(time(hour=8, minute=0), time(hour=9, minute=20)),
@@ -115,6 +126,7 @@ class DateCell:
         self.time = target_datetime.time()
         self.date = target_datetime.date()
         self.time_slots = []
+        self.slots_index = {}
         self.__set_weekday()
 
         if is_new:
@@ -126,7 +138,14 @@ class DateCell:
     def __set_time_slots(self):
         for slot in self.time_slots_template:
             if slot.end > self.time:
-                self.time_slots.append(copy.copy(slot))
+                self.add_time_slot(copy.copy(slot))
+
+    def add_time_slot(self, time_slot: TimeSlot):
+        self.time_slots.append(time_slot)
+        self.slots_index[time_slot.index] = time_slot
+
+    def get_time_slot(self, slot_index: int) -> TimeSlot | None:
+        return self.slots_index.get(slot_index)
 
     def __set_weekday(self):
         weekday_names = {
@@ -151,7 +170,7 @@ class DateCell:
         )
 
         for slot in self.time_slots:
-            new_date_cell.time_slots.append(copy.copy(slot))
+            new_date_cell.add_time_slot(copy.copy(slot))
 
         return new_date_cell
 
@@ -167,10 +186,26 @@ class Room:
         self.equipment: list = equipment
         self.zoom: bool = zoom
         self.dates: list = []
+        self.dates_index: dict = {} # date cells by ISO date
 
+    def add_date(self, date_cell: DateCell):
+        self.dates.append(date_cell)
+        self.dates_index[date_cell.date.isoformat()] = date_cell
+
+    def get_date(self, iso_date: str) -> DateCell | None:
+        return self.dates_index.get(iso_date)
+
+    # Date cells (shared, read only) that have time slots left, or free time slots if free_only
+    def dates_with_slots(self, free_only: bool = False) -> list[DateCell]:
+        if free_only:
+            return [date_cell for date_cell in self.dates if any(slot.status.is_free for slot in date_cell.time_slots)]
+        return [date_cell for date_cell in self.dates if date_cell.time_slots]
 
     def __copy__(self):
-        return Room(self.room_number, self.room_type, self.capacity, self.equipment, self.zoom)
+        new_item = Room(self.room_number, self.room_type, self.capacity, self.equipment, self.zoom)
+        for date_cell in self.dates:
+            new_item.add_date(copy.copy(date_cell))
+        return new_item
 
 
 
@@ -184,14 +219,25 @@ class Building:
         self.building_name = building_name
         self.address = building_address
         self.rooms = []
+        self.rooms_index = {} # rooms by room number
 
     def add_rooms(self, rooms: list[Room]):
         self.rooms.extend(rooms)
+        for room in rooms:
+            self.rooms_index[room.room_number] = room
+
+    def get_room(self, room_number: str) -> Room | None:
+        return self.rooms_index.get(room_number)
+
+    # New building sharing all rooms except the replaced one
+    def with_room(self, room: Room) -> "Building":
+        new_item = Building(self.building_name, self.address)
+        new_item.add_rooms([room if item.room_number == room.room_number else item for item in self.rooms])
+        return new_item
 
     def __copy__(self):
         new_item = Building(self.building_name, self.address)
-        for room in self.rooms:
-            new_item.rooms.append(copy.copy(room))
+        new_item.add_rooms([copy.copy(room) for room in self.rooms])
         return new_item
 
     def __repr__(self):
@@ -199,45 +245,207 @@ class Building:
 
 
 
+# Room data parsed from its worksheet column, reused between refreshes while the column is unchanged
+class ParsedRoom:
+    """
+    Represents schedule data of a room parsed from a worksheet column.
+
+    Attributes:
+        room_number (str): room number.
+        room_type (str): room type.
+        capacity (int): room capacity.
+        equipment (list[str]): equipment in the room.
+        zoom (bool): zoom support.
+        busy_slots (dict): (date, slot start) -> (name, comment) of slots busy by schedule.
+    """
+    def __init__(self, room_number: str, room_type: str, capacity: int, equipment: list, zoom: bool, busy_slots: dict):
+        self.room_number = room_number
+        self.room_type = room_type
+        self.capacity = capacity
+        self.equipment = equipment
+        self.zoom = zoom
+        self.busy_slots = busy_slots
+
+
+# Parse results of a building worksheet kept for the next refresh
+class ParsedBuilding:
+    """
+    Attributes:
+        sheet_hash (bytes): hash of the whole worksheet data.
+        dates (tuple[date]): dates the rooms were parsed for.
+        rooms (list[tuple[bytes, ParsedRoom]]): parsed rooms with hash of their worksheet column (in column order).
+    """
+    def __init__(self, sheet_hash: bytes, dates: tuple, rooms: list):
+        self.sheet_hash = sheet_hash
+        self.dates = dates
+        self.rooms = rooms
+
+
+# Published version of the schedule, readers use it without any lock
+class ScheduleSnapshot:
+    """
+    Represents one published version of the schedule.
+
+    Once published the snapshot (and every building, room, date cell and time slot in it) is never changed,
+    slot status updates publish a new snapshot that copies only the affected room and shares everything else.
+
+    Attributes:
+        buildings (list[Building]): buildings in worksheet order.
+        buildings_index (dict[str, Building]): buildings by building name (code).
+        availability (AvailabilityStore): bitmask of free slots of the buildings.
+    """
+    def __init__(self, buildings: list[Building] = None, availability: AvailabilityStore = None):
+        self.buildings = buildings or []
+        self.buildings_index = {building.building_name: building for building in self.buildings}
+        self.availability = availability or AvailabilityStore()
+
+    def get_room(self, building_name: str, room_number: str) -> Room | None:
+        building = self.buildings_index.get(building_name)
+        return building.get_room(room_number) if building else None
+
+    def set_slot_status(self, building_name: str, room_number: str,
+                        target_date: date, time_slot: TimeSlot,
+                        is_free: bool, name: str = None) -> bool:
+        # Changes snapshot in place, only for snapshots that are not published yet
+        room = self.get_room(building_name, room_number)
+        date_cell = room.get_date(target_date.isoformat()) if room else None
+        slot = date_cell.get_time_slot(TIME_SLOT_INDEXES.get(time_slot.start)) if date_cell else None
+
+        if slot is None or slot.end != time_slot.end:
+            return False
+
+        slot.status.is_free = is_free
+        if name:
+            slot.status.name = name
+
+        self.availability.set_slot(building_name, room_number, target_date.isoformat(), slot.index,
+                                   is_free, slot.status.name, slot.status.comment)
+        return True
+
+    def with_slot_status(self, building_name: str, room_number: str,
+                         target_date: date, time_slot: TimeSlot,
+                         is_free: bool, name: str = None) -> "ScheduleSnapshot | None":
+        """
+        Returns:
+            ScheduleSnapshot | None: new snapshot with changed slot status (copy on write of the room),
+            "None" if there is no such slot
+        """
+        building = self.buildings_index.get(building_name)
+        room = building.get_room(room_number) if building else None
+        if room is None:
+            return None
+
+        new_building = building.with_room(copy.copy(room))
+        new_snapshot = ScheduleSnapshot(
+            [new_building if item is building else item for item in self.buildings],
+            self.availability.copy_room(building_name, room_number)
+        )
+
+        if not new_snapshot.set_slot_status(building_name, room_number, target_date, time_slot, is_free, name):
+            return None
+        return new_snapshot
+
+
 class ScheduleCalendar:
     def __init__(self):
-        self.buildings = []
+        # current published schedule, replaced as a whole and never changed in place
+        self.snapshot = ScheduleSnapshot()
+
+        # serializes writers only, readers never wait for it
         self.lock = asyncio.Lock()
 
-    async def get_buildings_dict(self) -> dict:
-        buildings_dict = {}
-        async with self.lock:
-            for building in self.buildings:
-                buildings_dict[building.building_name] = building.address
+        # slot updates made while a new schedule is being built (replayed after swap)
+        self.pending_slot_updates = None
 
-        return buildings_dict
+        # parse results of the last refresh by building name (for incremental refresh)
+        self.parse_cache = {}
 
-    async def get_rooms_list_by_building_name(self, building_name: str) -> list:
-        rooms = []
-        async with self.lock:
-            for building in self.buildings:
-                if building.building_name == building_name:
-                    for room in building.rooms:
-                        rooms.append(room.room_number)
-                    break
+    @property
+    def buildings(self) -> list[Building]:
+        return self.snapshot.buildings
 
-        return rooms
+    @property
+    def buildings_index(self) -> dict:
+        return self.snapshot.buildings_index
+
+    @property
+    def availability(self) -> AvailabilityStore:
+        return self.snapshot.availability
+
+    async def get_buildings_dict(self) -> dict:
+        snapshot = self.snapshot
+        return {name: building.address for name, building in snapshot.buildings_index.items()}
+
+    async def get_rooms_list_by_building_name(self, building_name: str) -> list:
+        building = self.snapshot.buildings_index.get(building_name)
+        return list(building.rooms_index) if building else []
 
     async def get_rooms_by_capacity(self, building_name: str, capacity_range: str, as_numbers: bool = False):
         """Get rooms filtered by capacity range"""
         rooms = []
-        async with self.lock:
-            for building in self.buildings:
-                if building.building_name == building_name:
-                    for room in building.rooms:
-                        if self._room_matches_capacity(room, capacity_range):
-                            if as_numbers:
-                                rooms.append(room.room_number)
-                            else:
-                                rooms.append(room)
-                    break
+        building = self.snapshot.buildings_index.get(building_name)
+        if building:
+            for room in building.rooms:
+                if self._room_matches_capacity(room, capacity_range):
+                    if as_numbers:
+                        rooms.append(room.room_number)
+                    else:
+                        rooms.append(room)
         return rooms
 
+    async def search_rooms(self, building_name: str, capacity_range: str, iso_date: str = None,
+                           slot_index: int = None, equipment: list[str] = None) -> list[Room]:
+        """
+        Search rooms that have free slots.
+
+        Parameters:
+            building_name (str): building name (code).
+            capacity_range (str): "small", "medium" or "large".
+            iso_date (str): if set, room must have a free slot on this date.
+            slot_index (int): if set together with date, room must be free at this time slot.
+            equipment (list[str]): equipment that must be in the room.
+
+        Returns:
+            list[Room]: matching rooms, the best capacity fit (smallest suitable room) first,
+            rooms with more free slots first among equal capacity
+        """
+        required_equipment = {item.lower() for item in equipment or []}
+        found = []
+
+        # rooms and availability are taken from the same snapshot
+        snapshot = self.snapshot
+        availability = snapshot.availability
+        building = snapshot.buildings_index.get(building_name)
+        if building is None:
+            return found
+
+        for room in building.rooms:
+            if not self._room_matches_capacity(room, capacity_range):
+                continue
+            if required_equipment and not required_equipment <= self._room_equipment(room):
+                continue
+
+            if iso_date is not None and slot_index is not None:
+                has_availability = bool(availability.free_mask(building_name, room.room_number, iso_date) >> slot_index & 1)
+            elif iso_date is not None:
+                has_availability = bool(availability.free_mask(building_name, room.room_number, iso_date))
+            else:
+                has_availability = availability.free_slots_count(building_name, room.room_number) > 0
+
+            if has_availability:
+                found.append((room.capacity, -availability.free_slots_count(building_name, room.room_number), room))
+
+        found.sort(key=lambda item: item[:2])
+        return [room for _, _, room in found]
+
+    @staticmethod
+    def _room_equipment(room: Room) -> set[str]:
+        """Equipment names of the room in lower case, "zoom" is parsed into its own flag and added here"""
+        equipment = {item.lower() for item in room.equipment or []}
+        if room.zoom:
+            equipment.add("zoom")
+        return equipment
+
     def _room_matches_capacity(self, room: Room, capacity_range: str) -> bool:
         """Check if room matches capacity requirements"""
         if not room.capacity:
@@ -253,47 +461,62 @@ class ScheduleCalendar:
 
     async def get_room_by_number(self, building_name: str, room_number: str) -> Room:
         """Get room object by building and room number"""
-        async with self.lock:
-            for building in self.buildings:
-                if building.building_name == building_name:
-                    for room in building.rooms:
-                        if room.room_number == room_number:
-                            return room
-        return None
+        return self.snapshot.get_room(building_name, room_number)
+
+    async def get_free_slot_indexes(self, building_name: str, room_number: str, iso_date: str) -> list[int]:
+        """Get indexes of free time slots of the room on the date"""
+        return self.snapshot.availability.free_slots(building_name, room_number, iso_date)
+
+    async def get_rooms_free_at(self, building_name: str, iso_date: str, slot_index: int) -> list[str]:
+        """Get numbers of building rooms that are free on the date at the time slot"""
+        return self.snapshot.availability.rooms_free_at(building_name, iso_date, slot_index)
 
     async def update_room_slot_status(self, building_name: str, room_number: str,
                                       target_date: date, time_slot: TimeSlot,
                                       is_free: bool, name: str = None):
         """Update room slot status in shared schedule"""
         async with self.lock:
-            for building in self.buildings:
-                if building.building_name == building_name:
-                    for room in building.rooms:
-                        if room.room_number == room_number:
-                            for date_cell in room.dates:
-                                if date_cell.date == target_date:
-                                    for slot in date_cell.time_slots:
-                                        if slot.start == time_slot.start and slot.end == time_slot.end:
-                                            slot.status.is_free = is_free
-                                            if name:
-                                                slot.status.name = name
-                                            return True
-        return False
+            if self.pending_slot_updates is not None:
+                self.pending_slot_updates.append((building_name, room_number, target_date, time_slot, is_free, name))
+
+            new_snapshot = self.snapshot.with_slot_status(building_name, room_number, target_date, time_slot, is_free, name)
+            if new_snapshot is None:
+                return False
+
+            # Publish new version with a single reference swap
+            self.snapshot = new_snapshot
+            return True
 
     async def update_schedule(self):
+        # Build new schedule in a separate calendar without holding the lock,
+        # readers keep using the current snapshot until the new one is ready
         async with self.lock:
-            self.buildings.clear()
-            # for building in schedule.buildings:
-            #     self.buildings.append(copy.copy(building))
-            await self.import_schedule()
+            self.pending_slot_updates = []
+
+        try:
+            new_calendar = ScheduleCalendar()
+            await new_calendar.import_schedule(previous_parse_cache=self.parse_cache)
+            new_snapshot = new_calendar.snapshot
+
+            async with self.lock:
+                # Replay bookings made while the new schedule was being built (it is not published yet)
+                for update in self.pending_slot_updates:
+                    new_snapshot.set_slot_status(*update)
+
+                # Publish new snapshot with a single reference swap
+                self.snapshot = new_snapshot
+                self.parse_cache = new_calendar.parse_cache
+        finally:
+            self.pending_slot_updates = None
 
     def __copy__(self):
         new_item = ScheduleCalendar()
-        for building in self.buildings:
-            new_item.buildings.append(copy.copy(building))
+        new_item.snapshot = ScheduleSnapshot(
+            [copy.copy(building) for building in self.buildings], self.availability.copy()
+        )
         return new_item
 
-    async def import_schedule(self):
+    async def import_schedule(self, previous_parse_cache: dict = None):
         # Current date and time in specific timezone
         current_datetime = datetime.now(UTC) + timedelta(hours=config.TIMEZONE)
         required_datetimes = [current_datetime]
@@ -303,229 +526,181 @@ class ScheduleCalendar:
                 current_datetime - timedelta(hours=current_datetime.hour, minutes=current_datetime.minute, seconds=current_datetime.second) + timedelta(days=i + 1)
             )
 
-        # Fetch sheet metadata
-        metadata = conn.spreadsheet.fetch_sheet_metadata(params={'fields': 'sheets.merges'})
-
-        for worksheet in conn.spreadsheet.worksheets()[:1]:
-            # load all values
-            worksheet_data = worksheet.get_all_values()
-
-            # Copy data to empty merged cells
-            for merges in metadata["sheets"]:
-                for merge in merges["merges"]:
-                    if merge.get("sheetId") == worksheet.id or (merge.get("sheetId") is None and worksheet.id == 0):
-                        for i in range(merge["startRowIndex"], merge["endRowIndex"]):
-                            for j in range(merge["startColumnIndex"], merge["endColumnIndex"]):
-                                if not (i == merge["startRowIndex"] and j == merge["startColumnIndex"]):
-                                    worksheet_data[i][j] = worksheet_data[merge["startRowIndex"]][
-                                        merge["startColumnIndex"]]
-
-            # Building name from spreadsheet
-            building_name = worksheet.title.lower()
-
-            # If address is available for the building, then use address, otherwise use name as address
-            if BUILDINGS.get(building_name):
-                building_address = BUILDINGS.get(building_name)
-            else:
-                building_address = building_name
-
-            # Create building sample
-            building = Building(building_name, building_address)
+        # Load all bookings for the whole horizon at once and index them by slot
+        records = await get_records_by_period(required_datetimes[0].date(), required_datetimes[-1].date())
+        booked_slots = {
+            (record.building, record.room, record.date, record.time_slot_start, record.time_slot_end): record
+            for record in records
+        }
 
-            rooms = []
+        # Fetch worksheets properties and merges, then values of all worksheets in one call
+        metadata = await conn.fetch_sheet_metadata(params={'fields': 'sheets(properties(sheetId,title),merges)'})
+        sheets_properties = [sheet["properties"] for sheet in metadata["sheets"]]
+        values_data = await conn.values_batch_get(
+            [absolute_range_name(properties["title"]) for properties in sheets_properties]
+        )
 
-            # Start parsing
-            for i, room_number in enumerate(worksheet_data[1][2:]):
-                room_type = worksheet_data[2][i + 2]
+        # Copy data to empty merged cells
+        merges_start = time_counter()
+        merges_by_sheet = group_merges_by_sheet(metadata)
+        worksheets_data = []
+        for properties, value_range in zip(sheets_properties, values_data["valueRanges"]):
+            worksheet_data = fill_gaps(value_range.get("values", []))
+            expand_merges(worksheet_data, merges_by_sheet.get(properties["sheetId"], []))
+            worksheets_data.append(worksheet_data)
+        logging.info(f"Merged cells of {len(worksheets_data)} worksheets expanded in {time_counter() - merges_start:.3f}s")
+
+        # Parse every building worksheet concurrently
+        results = await asyncio.gather(*(
+            asyncio.to_thread(
+                self._parse_building,
+                properties["title"],
+                worksheet_data,
+                required_datetimes,
+                booked_slots,
+                (previous_parse_cache or {}).get(properties["title"].lower())
+            )
+            for properties, worksheet_data in zip(sheets_properties, worksheets_data)
+        ), return_exceptions=True)
+
+        buildings = []
+        for properties, result in zip(sheets_properties, results):
+            # Worksheet that does not follow schedule layout is skipped, other buildings are still served
+            if isinstance(result, Exception):
+                logging.warning(f"Worksheet \"{properties['title']}\" was not imported: {result!r}")
+                continue
 
-                # List of equipment to specific room
-                equipment = [k for k in worksheet_data[3][i + 2].split(", ") if k is not None]
+            # Add buildings to building list
+            buildings.append(result)
 
-                # Zoom support: bool
-                zoom = "Zoom" in equipment
-                if zoom:
-                    equipment.remove("Zoom")
+        # Compact availability of all rooms for bit operation queries
+        self.snapshot = ScheduleSnapshot(
+            buildings,
+            AvailabilityStore.from_buildings(buildings, tuple(item.date() for item in required_datetimes))
+        )
 
-                # Room capacity (max)
-                capacity = worksheet_data[4][i + 2] if worksheet_data[4][i + 2] == "" else int(worksheet_data[4][i + 2])
+    def _parse_building(self, sheet_title: str, worksheet_data: list[list[str]],
+                        required_datetimes: list[datetime], booked_slots: dict,
+                        previous: ParsedBuilding | None = None) -> Building:
+        # Building name from spreadsheet
+        building_name = sheet_title.lower()
+
+        # If address is available for the building, then use address, otherwise use name as address
+        if BUILDINGS.get(building_name):
+            building_address = BUILDINGS.get(building_name)
+        else:
+            building_address = building_name
+
+        # Create building sample
+        building = Building(building_name, building_address)
+
+        dates = tuple(item.date() for item in required_datetimes)
+        sheet_hash = self.data_hash(worksheet_data)
+
+        if previous is not None and previous.dates == dates and previous.sheet_hash == sheet_hash:
+            # Nothing changed in the worksheet, reuse all parsed rooms
+            parsed_rooms = previous.rooms
+        else:
+            # Reparse only rooms whose columns changed
+            previous_rooms = dict(previous.rooms) if previous is not None and previous.dates == dates else {}
+            parsed_rooms = []
+            for i in range(2, len(worksheet_data[1])):
+                column = [row[i] for row in worksheet_data]
+                column_hash = self.data_hash([column])
+                parsed_room = previous_rooms.get(column_hash)
+                if parsed_room is None:
+                    parsed_room = self._parse_room_column(column, dates)
+                parsed_rooms.append((column_hash, parsed_room))
+
+        self.parse_cache[building_name] = ParsedBuilding(sheet_hash, dates, parsed_rooms)
+
+        # Build rooms from parsed data and bookings from database
+        building.add_rooms([
+            self._build_room(parsed_room, building_address, required_datetimes, booked_slots)
+            for _, parsed_room in parsed_rooms
+        ])
+        return building
+
+    # Hash of worksheet rows (or a single column)
+    @staticmethod
+    def data_hash(rows: list[list[str]]) -> bytes:
+        hasher = hashlib.blake2b(digest_size=16)
+        for row in rows:
+            hasher.update("\x1f".join(row).encode())
+            hasher.update(b"\x1e")
+        return hasher.digest()
+
+    def _parse_room_column(self, column: list[str], dates: tuple) -> ParsedRoom:
+        room_number = column[1]
+        room_type = column[2]
+
+        # List of equipment to specific room
+        equipment = [k for k in column[3].split(", ") if k is not None]
+
+        # Zoom support: bool
+        zoom = "Zoom" in equipment
+        if zoom:
+            equipment.remove("Zoom")
+
+        # Room capacity (max)
+        capacity = column[4] if column[4] == "" else int(column[4])
+
+        # Slots busy by schedule for every date and time slot
+        busy_slots = {}
+        for target_date in dates:
+            weekday_no = target_date.weekday()
+            for slot_index, slot in enumerate(TIME_SLOTS):
+                # To locate exact row for each day and time slot
+                row = 9 * weekday_no + slot_index + 5
+
+                # Parse cell data (compiled once per distinct cell contents)
+                cell_data = compile_cell(column[row]).busy_on(target_date)
+                if cell_data:
+                    busy_slots[(target_date, slot["start"])] = (cell_data[0], cell_data[1])
+
+        return ParsedRoom(room_number, room_type, capacity, equipment, zoom, busy_slots)
 
-                # Creating room sample
-                new_room = Room(
-                    room_number=room_number,
-                    room_type=room_type,
-                    capacity=capacity,
-                    equipment=equipment,
-                    zoom=zoom
-                )
+    @staticmethod
+    def _build_room(parsed_room: ParsedRoom, building_address: str,
+                    required_datetimes: list[datetime], booked_slots: dict) -> Room:
+        # Creating room sample
+        new_room = Room(
+            room_number=parsed_room.room_number,
+            room_type=parsed_room.room_type,
+            capacity=parsed_room.capacity,
+            equipment=list(parsed_room.equipment),
+            zoom=parsed_room.zoom
+        )
 
-                # Adding dates to room object
-                for item in required_datetimes:
-                    new_room.dates.append(
-                        DateCell(item)
+        # Adding dates to room object
+        for item in required_datetimes:
+            date_cell = DateCell(item)
+
+            # Update time slots available
+            for slot in date_cell.time_slots:
+                cell_data = parsed_room.busy_slots.get((date_cell.date, slot.start))
+                # Update slot status if cell is not free
+                if cell_data:
+                    slot.status.is_free = False
+                    slot.status.name = cell_data[0]
+                    slot.status.comment = cell_data[1]
+                else:
+                    # check loaded records if cell was booked
+                    record = booked_slots.get(
+                        (building_address, new_room.room_number, date_cell.date, slot.start, slot.end)
                     )
 
-                # Update time slots available
-                for k, date_cell in enumerate(new_room.dates):
-                    weekday_no = date_cell.date.weekday()
-                    for l, slot in enumerate(date_cell.time_slots):
-                        # To locate exact row for each day and time slot
-                        row = 9 * weekday_no + date_cell.get_time_slot_index(slot) + 5
-
-                        # Here starts the cell parser of spreadsheet
-                        # Get cell contents
-                        cell_contents = worksheet_data[row][i + 2]
-                        # Parse cell data
-                        cell_data = self.__cell_parser(cell_contents, date_cell.date)
-                        # Update slot status if cell is not free
-                        if cell_data:
-                            new_room.dates[k].time_slots[l].status.is_free = False
-                            new_room.dates[k].time_slots[l].status.name = cell_data[0]
-                            new_room.dates[k].time_slots[l].status.comment = cell_data[1]
-                        else:
-                            # check database for records if cell was booked
-                            record = await check_if_booked(
-                                building=building.address,
-                                room=new_room.room_number,
-                                date=date_cell.date,
-                                start=slot.start,
-                                end=slot.end
-                            )
-
-                            if record:
-                                new_room.dates[k].time_slots[l].status.is_free = False
-                                new_room.dates[k].time_slots[l].status.name = record.user.full_name if record.user else None
-                                new_room.dates[k].time_slots[l].status.comment = None
-
-                # Adding room to rooms list
-                rooms.append(new_room)
-
-            # Add rooms to building list
-            building.add_rooms(rooms)
-            # Add buildings to building list
-            self.buildings.append(building)
-
-    def __cell_parser(self, cell_contents: str, target_date: date):
-        result = []
-        current_cell = cell_contents
+                    if record:
+                        slot.status.is_free = False
+                        slot.status.name = record.user.full_name if record.user else None
+                        slot.status.comment = None
 
-        # Divide cell contents by upper and lower weeks and decide with which one to proceed with
-        if "---" in current_cell:
-            m = re.match(r'(?s)\A(.*?)\r?\n?[ \t]*-+[ \t]*\r?\n?(.*)\Z', current_cell)
-            if m and self.is_upper_week(target_date):
-                current_cell = m.group(1).strip()
-            elif m:
-                current_cell = m.group(2).strip()
-
-        if current_cell == "***":
-            return result
-
-        for line in current_cell.split("\n"):
-            line_data = [k.strip() for k in line[1:].split("-")]
-
-            if line == "***" or line == "":
-                continue
-            if line[0] == "!":
-                exact_dates_pattern = r"^(?:\d{1,2}\.\d{1,2}\.\d{4})(?:,\s*\d{1,2}\.\d{1,2}\.\d{4})*$"
-                exact_dates_raw = re.findall(exact_dates_pattern, line_data[0])
-                exact_dates = []
-                if exact_dates_raw:
-                    for item in exact_dates_raw:
-                        exact_dates.append(
-                            datetime.strptime(item, "%d.%m.%Y").date()
-                        )
-                if target_date in exact_dates:
-                    name = line_data[1]
-                    comment = "-".join(line_data[2:]) if len(line_data) > 2 else None
-                    result.extend([name, comment])
-            elif line[0] == "#":
-                if "с " in line and "по " in line:
-                    pattern_from = r"с\s+(\d{2}\.\d{2}\.\d{4})"
-                    pattern_to = r"по\s+(\d{2}\.\d{2}\.\d{4})"
-                    start_date_raw = re.findall(pattern_from, line[1:])
-                    end_date_raw = re.findall(pattern_to, line[1:])
-                    if start_date_raw and end_date_raw:
-                        start_date = datetime.strptime(start_date_raw[0], "%d.%m.%Y").date()
-                        end_date = datetime.strptime(end_date_raw[0], "%d.%m.%Y").date()
-                        date_diff = target_date - start_date
-                        step = 14 if "---" in cell_contents else 7
-                        if start_date <= target_date <= end_date and date_diff.days % step == 0:
-                            name = line_data[1]
-                            comment = "-".join(line_data[2:]) if len(line_data) > 2 else None
-                            result = [name, comment]
-                elif "с " in line:
-                    pattern_from = r"с\s+(\d{2}\.\d{2}\.\d{4})"
-                    start_date_raw = re.findall(pattern_from, line[1:])
-                    if start_date_raw:
-                        start_date = datetime.strptime(start_date_raw[0], "%d.%m.%Y").date()
-                        if start_date <= target_date:
-                            date_diff = target_date - start_date
-                            step = 14 if "---" in cell_contents else 7
-                            if date_diff.days % step == 0:
-                                name = line_data[1]
-                                comment = "-".join(line_data[2:]) if len(line_data) > 2 else None
-                                result = [name, comment]
-                elif "по " in line:
-                    pattern_to = r"по\s+(\d{2}\.\d{2}\.\d{4})"
-                    end_date_raw = re.findall(pattern_to, line[1:])
-                    if end_date_raw:
-                        end_date = datetime.strptime(end_date_raw[0], "%d.%m.%Y").date()
-                        if end_date >= target_date:
-                            date_diff = end_date - target_date
-                            step = 14 if "---" in cell_contents else 7
-                            if date_diff.days % step == 0:
-                                name = line_data[1]
-                                comment = "-".join(line_data[2:]) if len(line_data) > 2 else None
-                                result = [name, comment]
-            elif line[0] == "*":
-                if "в " in line:
-                    pattern_out = r'(?P<date>\d{1,2}\.\d{1,2}\.\d{4})\s+[вВ]\s+(?P<room>\d{3})\*{3}'
-                    out_date_raw = re.findall(pattern_out, line[1:])
-                    if out_date_raw:
-                        out_date = datetime.strptime(out_date_raw[0][0], "%d.%m.%Y").date()
-                        if out_date == target_date:
-                            result = []
-
-                elif "из " in line:
-                    pattern_in = r'(?P<date>\d{1,2}\.\d{1,2}\.\d{4})\s+из\s+(?P<room>\d{3})\*{3}'
-                    in_date_raw = re.findall(pattern_in, line[1:])
-                    if in_date_raw:
-                        in_date = datetime.strptime(in_date_raw[0][0], "%d.%m.%Y").date()
-                        if in_date == target_date:
-                            room = in_date_raw[0][1]
-                            name = f"Перенос с аудитории {room}"
-                            comment = None
-                            result = [name, comment]
-            elif line[0] == "$":
-                name = line_data[0]
-                comment = "-".join(line_data[1:]) if len(line_data) > 1 else None
-                result = [name, comment]
-        return result
+            new_room.add_date(date_cell)
 
+        return new_room
 
     # Verify if week is upper (else it is lower)
-    @staticmethod
-    def is_upper_week(
-            target_date: date,
-            upper_week_date: date = config.UPPER_WEEK_START_DATE
-    ) -> bool:
-        """
-        Parameters:
-            target_date (datetime.date): The date to be checked if it is in an upper week
-            upper_week_date (datetime.date): The date indicating start of upper week
-
-        Returns:
-            bool: 'True' if it is upper week, 'False' otherwise
-        """
-
-        # Weekday of upper week date
-        upper_week_weekday = upper_week_date.weekday()
-
-        # First day of the first upper week
-        upper_week_first_date = upper_week_date - timedelta(days=upper_week_weekday)
-
-        # calculate date difference between two dates + calculate weeks + identify if even or odd
-        time_diff = target_date - upper_week_first_date
-        return (time_diff.days // 7) % 2 == 0
+    is_upper_week = staticmethod(is_upper_week)
 
     def __repr__(self):
         return f"Buildings: {self.buildings}"
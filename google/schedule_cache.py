@@ -0,0 +1,117 @@
+import logging
+import os
+import pickle
+from datetime import datetime, date, time, timedelta, UTC
+from time import perf_counter as time_counter
+
+from config import config
+from google.availability import AvailabilityStore
+from google.schedule import (ScheduleSnapshot, Building, Room, DateCell, TimeSlot,
+                             TimeSlotStatus, TIME_SLOTS)
+
+
+# Version of the file layout, files of other versions are ignored
+SCHEDULE_CACHE_VERSION = 1
+
+
+# Snapshot as nested tuples of primitives (compact and fast to pickle)
+def dump_snapshot(snapshot: ScheduleSnapshot) -> dict:
+    return {
+        "version": SCHEDULE_CACHE_VERSION,
+        "saved_at": datetime.now(UTC).isoformat(),
+        "buildings": [
+            (building.building_name, building.address, [
+                (room.room_number, room.room_type, room.capacity, room.equipment, room.zoom, [
+                    (date_cell.date.toordinal(), date_cell.time.isoformat(), [
+                        (slot.index, slot.status.is_free, slot.status.name, slot.status.comment)
+                        for slot in date_cell.time_slots
+                    ])
+                    for date_cell in room.dates
+                ])
+                for room in building.rooms
+            ])
+            for building in snapshot.buildings
+        ]
+    }
+
+
+def load_snapshot(data: dict, current_datetime: datetime) -> ScheduleSnapshot:
+    """
+    Parameters:
+        data (dict): snapshot dumped by dump_snapshot.
+        current_datetime (datetime): current date and time in the schedule timezone,
+            dates before it are dropped and today's passed time slots are skipped.
+
+    Returns:
+        ScheduleSnapshot: restored snapshot
+    """
+    today = current_datetime.date().toordinal()
+    current_time = current_datetime.time().replace(tzinfo=None)
+    dates = set()
+
+    buildings = []
+    for building_name, address, rooms in data["buildings"]:
+        building = Building(building_name, address)
+        for room_number, room_type, capacity, equipment, zoom, date_cells in rooms:
+            room = Room(room_number, room_type, capacity, equipment, zoom)
+            for ordinal, cell_time, slots in date_cells:
+                if ordinal < today:
+                    continue
+
+                cell_time = time.fromisoformat(cell_time)
+                if ordinal == today:
+                    cell_time = max(cell_time, current_time)
+
+                date_cell = DateCell(datetime.combine(date.fromordinal(ordinal), cell_time), is_new=False)
+                for slot_index, is_free, name, comment in slots:
+                    time_slot = TimeSlot(TIME_SLOTS[slot_index]["start"], TIME_SLOTS[slot_index]["end"])
+                    if ordinal == today and time_slot.end <= date_cell.time:
+                        continue
+                    time_slot.status = TimeSlotStatus(is_free, name, comment)
+                    date_cell.add_time_slot(time_slot)
+
+                room.add_date(date_cell)
+                dates.add(date_cell.date)
+
+            building.add_rooms([room])
+        buildings.append(building)
+
+    return ScheduleSnapshot(buildings, AvailabilityStore.from_buildings(buildings, tuple(sorted(dates))))
+
+
+# Save schedule after a successful refresh (write to temporary file and replace, so a crash never leaves half a file)
+def save_schedule_cache(snapshot: ScheduleSnapshot, path: str = config.SCHEDULE_CACHE_PATH) -> bool:
+    if not path or not snapshot.buildings:
+        return False
+
+    temp_path = f"{path}.tmp"
+    try:
+        with open(temp_path, "wb") as file:
+            pickle.dump(dump_snapshot(snapshot), file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+        return True
+    except OSError as e:
+        logging.warning(f"Schedule cache was not saved to {path}: {e}")
+        return False
+
+
+# Load schedule saved by the previous run, "None" if there is no usable file
+def load_schedule_cache(path: str = config.SCHEDULE_CACHE_PATH) -> ScheduleSnapshot | None:
+    if not path or not os.path.exists(path):
+        return None
+
+    load_start = time_counter()
+    try:
+        with open(path, "rb") as file:
+            data = pickle.load(file)
+        if data.get("version") != SCHEDULE_CACHE_VERSION:
+            return None
+
+        current_datetime = datetime.now(UTC) + timedelta(hours=config.TIMEZONE)
+        snapshot = load_snapshot(data, current_datetime)
+    except (OSError, pickle.UnpicklingError, EOFError, KeyError, ValueError, TypeError) as e:
+        logging.warning(f"Schedule cache {path} was not loaded: {e!r}")
+        return None
+
+    logging.info(f"Schedule cache saved at {data['saved_at']} loaded in {time_counter() - load_start:.3f}s")
+    return snapshot
@@ -4,6 +4,7 @@ from typing import List
 
 from config import config
 from google.connection import conn
+from google.merges import group_merges_by_sheet, expand_merges
 import copy
 
 # GLOBAL VARIABLES
@@ -286,20 +287,14 @@ class ScheduleParser:
     def __import_schedule(self):
         # Fetch sheet metadata
         metadata = conn.spreadsheet.fetch_sheet_metadata(params={'fields': 'sheets.merges'})
+        merges_by_sheet = group_merges_by_sheet(metadata)
 
         for worksheet in conn.spreadsheet.worksheets():
             # load all values
             worksheet_data = worksheet.get_all_values()
 
             # Copy data to empty merged cells
-            for merges in metadata["sheets"]:
-                for merge in merges["merges"]:
-                    if merge.get("sheetId") == worksheet.id or (merge.get("sheetId") is None and worksheet.id == 0):
-                        for i in range(merge["startRowIndex"], merge["endRowIndex"]):
-                            for j in range(merge["startColumnIndex"], merge["endColumnIndex"]):
-                                if not (i == merge["startRowIndex"] and j == merge["startColumnIndex"]):
-                                    worksheet_data[i][j] = worksheet_data[merge["startRowIndex"]][
-                                        merge["startColumnIndex"]]
+            expand_merges(worksheet_data, merges_by_sheet.get(worksheet.id, []))
 
             # Building name from spreadsheet
             building_name = worksheet.title.lower()
@@ -1,9 +1,12 @@
 import asyncio
+import logging
 # from google.schedule_parser import temp_data, load_and_parse
 # from google.connection import conn
 # import copy
 # from datetime import date
+from google.connection import GoogleAPIUnavailable
 from google.schedule import ScheduleCalendar
+from google.schedule_cache import load_schedule_cache, save_schedule_cache
 from config import config
 
 
@@ -12,9 +15,23 @@ SCHEDULE_SHARED = ScheduleCalendar()
 
 
 async def update_schedule():
+    # serve schedule saved by the previous run until the first refresh is done
+    snapshot = await asyncio.to_thread(load_schedule_cache, config.SCHEDULE_CACHE_PATH)
+    if snapshot is not None and not SCHEDULE_SHARED.buildings:
+        SCHEDULE_SHARED.snapshot = snapshot
+
+    interval = config.SCHEDULE_UPDATE_INTERVAL * 60
+    failures = 0
     while True:
-        await SCHEDULE_SHARED.update_schedule()
-        await asyncio.sleep(config.SCHEDULE_UPDATE_INTERVAL * 60)
+        # previous schedule is served while Google API fails, attempts are repeated sooner (up to the interval)
+        try:
+            await SCHEDULE_SHARED.update_schedule()
+            await asyncio.to_thread(save_schedule_cache, SCHEDULE_SHARED.snapshot, config.SCHEDULE_CACHE_PATH)
+            failures = 0
+        except GoogleAPIUnavailable as e:
+            failures += 1
+            logging.warning(f"Schedule update failed, Google API is not available: {e}")
+        await asyncio.sleep(min(interval, 30 * 2 ** (failures - 1)) if failures else interval)
 
 #
 # # lock for the global variable